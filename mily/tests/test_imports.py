@@ -4,7 +4,8 @@ import pytest
 
 @pytest.mark.parametrize("name", [
     "MTableItemDelegate", "MTableInterfaceView", "MTableInterfaceWidget",
-    "MFunctionTableInterfaceWidget",
+    "MFunctionTableInterfaceWidget", "MStandardItemModel", "MColumnarTableModel",
+    "MTableSchema", "MTableUndoStack", "MExecutionQueue",
     "MText", "MISpin", "MFSpin", "MComboBox", "MCheckBox", "MSelector", "MDateTime",
     "MetaDataEntry", "vstacked_label", "hstacked_label",
 ])
@@ -0,0 +1,190 @@
+"""
+A persistent on-disk cache for the results of expensive background computations
+"""
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_SCALARS = (str, bytes, int, float, complex, bool, type(None), np.generic)
+
+
+def _update(hasher, obj):
+    """Feed a canonical byte representation of ``obj`` to ``hasher``"""
+    if isinstance(obj, np.ndarray):
+        hasher.update(f'ndarray{obj.dtype.str}{obj.shape}'.encode())
+        if obj.dtype.hasobject:
+            for item in obj.ravel():
+                _update(hasher, item)
+        else:
+            hasher.update(np.ascontiguousarray(obj).data)
+    elif isinstance(obj, _SCALARS):
+        hasher.update(f'{type(obj).__name__}:{obj!r};'.encode())
+    elif isinstance(obj, (list, tuple)):
+        hasher.update(f'{type(obj).__name__}[{len(obj)}]'.encode())
+        for item in obj:
+            _update(hasher, item)
+    elif isinstance(obj, (set, frozenset)):
+        # set ordering varies with string hash randomization, so sort the items by their hash
+        hashes = sorted(stable_hash(item) for item in obj)
+        hasher.update(f'{type(obj).__name__}[{len(hashes)}]'.encode())
+        for item_hash in hashes:
+            hasher.update(item_hash.encode())
+    elif isinstance(obj, dict):
+        # dict ordering is not significant, so sort the items by the hash of their keys
+        items = sorted((stable_hash(key), value) for key, value in obj.items())
+        hasher.update(f'dict[{len(items)}]'.encode())
+        for key_hash, value in items:
+            hasher.update(key_hash.encode())
+            _update(hasher, value)
+    else:
+        hasher.update(f'{type(obj).__qualname__}:'.encode())
+        hasher.update(pickle.dumps(obj, protocol=4))
+
+
+def stable_hash(*args, **kwargs):
+    """
+    Return a hex digest of the arguments which is stable between sessions.
+
+    NumPy arrays are hashed by dtype, shape and contents, and dicts and sets independently of their ordering.
+    Other objects are hashed by their pickled representation, so arguments that cannot be pickled cannot be hashed.
+    """
+    hasher = hashlib.sha256()
+    _update(hasher, args)
+    _update(hasher, kwargs)
+    return hasher.hexdigest()
+
+
+class DiskCache:
+    """
+    A size-capped, least-recently-used cache of pickled values in a directory.
+
+    Each entry is stored in its own file, prefixed by a checksum of its contents; entries that fail the check on
+    reading are discarded and treated as misses. Entries are written atomically, and the file modification time
+    records when each was last used so that the eviction order survives restarts.
+
+    Parameters
+    ----------
+    directory : str
+        Directory to store the entries in, created if necessary
+    max_size : int, optional
+        Maximum total size of the entries in bytes, default 1 GiB
+    """
+    _suffix = '.pkl'
+
+    def __init__(self, directory, max_size=2 ** 30):
+        self.directory = directory
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        entries = []
+        for filename in os.listdir(directory):
+            if filename.endswith(self._suffix):
+                stat = os.stat(os.path.join(directory, filename))
+                entries.append((stat.st_mtime, filename[:-len(self._suffix)], stat.st_size))
+        self._sizes = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._total = sum(self._sizes.values())
+
+    def key(self, func, *args, **kwargs):
+        """Return the cache key for calling ``func(*args, **kwargs)``"""
+        return stable_hash(func.__module__, func.__qualname__, *args, **kwargs)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self._suffix)
+
+    def lookup(self, key):
+        """
+        Return ``(True, value)`` if ``key`` is cached, otherwise ``(False, None)``
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as handle:
+                checksum = handle.read(32)
+                payload = handle.read()
+            if hashlib.sha256(payload).digest() != checksum:
+                raise ValueError('checksum mismatch')
+            value = pickle.loads(payload)
+        except FileNotFoundError:
+            return False, None
+        except Exception as ex:
+            logger.warning(f'Discarding corrupt cache entry {path}: {ex}')
+            self.discard(key)
+            return False, None
+
+        with self._lock:
+            if key in self._sizes:
+                self._sizes.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return True, value
+
+    def put(self, key, value):
+        """
+        Store ``value`` under ``key``, evicting the least recently used entries if needed
+        """
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        size = len(payload) + 32
+        if size > self.max_size:
+            return
+        handle, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as tmp:
+                tmp.write(hashlib.sha256(payload).digest())
+                tmp.write(payload)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        with self._lock:
+            self._total += size - self._sizes.pop(key, 0)
+            self._sizes[key] = size
+            evicted = []
+            while self._total > self.max_size:
+                old_key, old_size = self._sizes.popitem(last=False)
+                self._total -= old_size
+                evicted.append(old_key)
+        for old_key in evicted:
+            self._remove(old_key)
+
+    def discard(self, key):
+        """Remove ``key`` from the cache, if present"""
+        with self._lock:
+            self._total -= self._sizes.pop(key, 0)
+        self._remove(key)
+
+    def clear(self):
+        """Remove every entry from the cache"""
+        with self._lock:
+            keys = list(self._sizes)
+            self._sizes.clear()
+            self._total = 0
+        for key in keys:
+            self._remove(key)
+
+    def _remove(self, key):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    @property
+    def size(self):
+        """Total size of the cached entries in bytes"""
+        return self._total
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def __contains__(self, key):
+        return key in self._sizes
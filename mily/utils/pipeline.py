@@ -0,0 +1,202 @@
+"""
+Multi-stage streaming pipelines, with every stage on its own worker thread
+"""
+import queue
+import threading
+
+from . import threads
+
+
+_END = object()
+
+
+class _Run:
+    """The state shared by the stages of one run of a pipeline"""
+
+    def __init__(self):
+        self.stop = threading.Event()
+        self.failure = None
+        self.complete = False  # every item reached the end of the pipeline
+        self._lock = threading.Lock()
+
+    def stopping(self):
+        return self.stop.is_set() or threads.cancellation_requested()
+
+    def fail(self, exception):
+        """Record the first exception raised by a stage and stop every stage"""
+        with self._lock:
+            if self.failure is None:
+                self.failure = exception
+        self.stop.set()
+
+
+def _put(outbox, item, run):
+    """Put ``item`` on a bounded queue, giving up if the pipeline is stopping"""
+    while True:
+        try:
+            outbox.put(item, timeout=.1)
+            return True
+        except queue.Full:
+            if run.stopping():
+                return False
+
+
+def _items(inbox, run):
+    """
+    Yield the items arriving on ``inbox`` until the end of the stream, or until the pipeline is stopping; returns
+    True at the end of the stream
+    """
+    while not run.stop.is_set():
+        try:
+            item = inbox.get(timeout=.1)
+        except queue.Empty:
+            if run.stopping():
+                return False
+            continue
+        if item is _END:
+            return True
+        yield item
+    return False
+
+
+def _run_stage(transform, inbox, outbox, run):
+    try:
+        for item in transform(_items(inbox, run) if inbox is not None else None):
+            if not _put(outbox, item, run):
+                return
+    except Exception as ex:
+        # stops the stages upstream, which would otherwise block on their full queues, and those downstream
+        run.fail(ex)
+        return
+    _put(outbox, _END, run)
+
+
+def _sink(inbox, run):
+    try:
+        run.complete = yield from _items(inbox, run)
+    finally:
+        run.stop.set()
+    if run.failure is not None:
+        raise run.failure
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Pipeline:
+    """
+    A chain of streaming stages, each running on its own worker and connected by bounded queues.
+
+    Stages overlap, so that for example reading the next frame happens while the previous one is being reduced,
+    and the bounded queues stop a fast stage from running far ahead of a slow one. Only the final stage touches the
+    GUI, by invoking ``callback_slot`` in the main thread for every item that reaches the end of the pipeline.
+
+    ..code-block:: python
+
+        pipeline = (Pipeline(read_frames, path)
+                    .map(dark_subtract)
+                    .batch(10)
+                    .map(integrate))
+        pipeline.start(callback_slot=display)
+
+    An exception raised in any stage stops every stage, and is reported through ``except_slot`` by the final
+    stage. The final stage finishing in any way also stops every stage.
+
+    Parameters
+    ----------
+    source : callable
+        Called with ``*args`` and ``**kwargs`` on its own worker to produce an iterable of items
+    maxsize : int, optional
+        Capacity of the queue after each stage
+    pool : ThreadPool, optional
+        Pool to run the stages on, which must have a worker available for every stage
+    """
+
+    def __init__(self, source, *args, maxsize=8, pool=None, **kwargs):
+        self.source = source
+        self.args = args
+        self.kwargs = kwargs
+        self.maxsize = maxsize
+        self.pool = pool
+        self.stages = []
+        self.futures = []
+        self._run = None
+
+    def map(self, fn):
+        """Add a stage calling ``fn`` on every item"""
+        self.stages.append((getattr(fn, '__name__', repr(fn)), lambda items: (fn(item) for item in items)))
+        return self
+
+    def filter(self, predicate):
+        """Add a stage keeping the items for which ``predicate`` is true"""
+        self.stages.append((getattr(predicate, '__name__', repr(predicate)),
+                            lambda items: (item for item in items if predicate(item))))
+        return self
+
+    def batch(self, size):
+        """Add a stage grouping items into lists of ``size``; the last list may be shorter"""
+        self.stages.append((f'batch({size})', lambda items: _batches(items, size)))
+        return self
+
+    def start(self, callback_slot=None, finished_slot=None, except_slot=None, showBusy=True):
+        """
+        Start every stage
+
+        Parameters
+        ----------
+        callback_slot : function, optional
+            Called in the main thread with every item leaving the pipeline
+        finished_slot : function, optional
+            Called once every item has been delivered, so not if the pipeline is cancelled or fails
+        except_slot : function, optional
+            Called with the first exception raised by any stage
+        """
+        if self.futures:
+            raise ValueError('Pipeline could not be started; it is already running.')
+
+        def source(_):
+            return self.source(*self.args, **self.kwargs)
+        source.__name__ = getattr(self.source, '__name__', 'source')
+
+        self._run = run = _Run()
+        inbox = None
+        for name, transform in [(source.__name__, source)] + self.stages:
+            outbox = queue.Queue(self.maxsize)
+            future = threads.QThreadFuture(_run_stage, transform, inbox, outbox, run, showBusy=False,
+                                           pool=self.pool)
+            future.stage = name
+            self.futures.append(future)
+            inbox = outbox
+
+        def finished():
+            # the final stage also returns when it is cancelled
+            if run.complete:
+                finished_slot()
+
+        self.futures.append(
+            threads.QThreadFutureIterator(_sink, inbox, run, callback_slot=callback_slot,
+                                          finished_slot=finished if finished_slot else None,
+                                          except_slot=except_slot, showBusy=showBusy, pool=self.pool))
+
+        for future in self.futures:
+            future.start()
+
+    def cancel(self):
+        """Ask every stage to stop; does not block"""
+        if self._run is not None:
+            self._run.stop.set()
+        for future in self.futures:
+            future.request_cancel()
+
+    def wait(self, msecs=None):
+        """Wait for every stage to stop, returns False on timeout"""
+        args = () if msecs is None else (msecs,)
+        return all(future.wait(*args) for future in self.futures)
@@ -0,0 +1,115 @@
+"""
+A low-overhead sampling profiler for the worker threads of ``mily.utils.threads``
+"""
+import os
+import sys
+import threading
+from collections import Counter
+
+from . import threads
+
+
+class SamplingProfiler:
+    """
+    Periodically samples the stacks of threads running QThreadFutures.
+
+    Every ``interval`` seconds a background thread takes a snapshot of the stacks of the threads that are running a
+    QThreadFuture, and counts each stack under the name of the future's method. Only mily worker threads are
+    walked and frame labels are cached per code object, so the cost per sample is small enough to leave the
+    profiler running. The counts can be written in the collapsed-stack format read by ``flamegraph.pl`` and
+    speedscope.
+
+    Parameters
+    ----------
+    interval : float, optional
+        Seconds between samples
+    max_depth : int, optional
+        Maximum number of frames kept per stack, counted from the innermost frame
+    """
+
+    def __init__(self, interval=.01, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.counts = Counter()
+        self.samples = 0
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._skip = os.path.splitext(threads.__file__)[0]
+
+    def _label(self, code):
+        try:
+            return self._labels[code]
+        except KeyError:
+            label = f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+            self._labels[code] = label
+            return label
+
+    def sample(self):
+        """
+        Record one snapshot of the stacks of all running mily worker threads
+        """
+        frames = sys._current_frames()
+        for ident, future in list(threads._active.items()):
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                # drop the QThreadFuture/ThreadPool machinery around the method
+                if not code.co_filename.startswith(self._skip):
+                    stack.append(self._label(code))
+                frame = frame.f_back
+            stack.append(getattr(future.method, '__qualname__', 'UNKNOWN'))
+            self.counts[tuple(reversed(stack))] += 1
+        self.samples += 1
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        """Start sampling in a background thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='mily-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def clear(self):
+        """Discard all samples"""
+        self.counts.clear()
+        self.samples = 0
+
+    def by_method(self):
+        """Return a Counter of samples per QThreadFuture method"""
+        methods = Counter()
+        for stack, count in self.counts.items():
+            methods[stack[0]] += count
+        return methods
+
+    def collapsed(self):
+        """Return the samples as collapsed-stack lines, ``root;...;leaf count``"""
+        return [f'{";".join(stack)} {count}' for stack, count in self.counts.most_common()]
+
+    def dump_collapsed(self, path):
+        """Write the samples to ``path`` in the collapsed-stack format used by flamegraph tools"""
+        with open(path, 'w') as handle:
+            for line in self.collapsed():
+                handle.write(line + '\n')
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,177 @@
+"""
+Record the background task traffic of a session, and replay it as a synthetic load
+"""
+import gzip
+import json
+import sys
+import threading
+import time
+
+import numpy as np
+from qtpy.QtCore import QObject, QTimer, Signal
+
+from . import threads
+
+FORMAT_VERSION = 1
+
+
+def _name(fn):
+    return getattr(fn, '__qualname__', None) or getattr(fn, '__name__', None) or type(fn).__name__
+
+
+def _nbytes(obj):
+    """Estimate the size of an argument in bytes, counting arrays by their data"""
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(_nbytes(item) for item in obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(_nbytes(value) for value in obj.values())
+    return sys.getsizeof(obj)
+
+
+class TrafficRecorder:
+    """
+    Records every QThreadFuture run and ``invoke_in_main_thread`` callback to a gzipped JSON-lines file.
+
+    Each task is stored as ``["task", start, duration, method, arg_bytes, ok]`` and each callback as
+    ``["invoke", start, duration, fn]``, with times in seconds from the start of the recording. The file can be
+    replayed with ``TrafficReplayer``.
+
+    ..code-block:: python
+
+        with TrafficRecorder('session.jsonl.gz'):
+            app.exec_()
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = 0
+        self._lock = threading.Lock()
+        self._handle = None
+        self._origin = None
+
+    def start(self):
+        self._handle = gzip.open(self.path, 'wt')
+        self._origin = time.monotonic()
+        self._write({'version': FORMAT_VERSION, 'time': time.time()})
+        threads.set_tracer(self)
+
+    def stop(self):
+        threads.set_tracer(None)
+        with self._lock:
+            self._handle.close()
+            self._handle = None
+
+    def _write(self, record):
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self._lock:
+            if self._handle is not None:
+                self._handle.write(line)
+                self.records += 1
+
+    def task(self, future, started, duration):
+        arg_bytes = _nbytes(future.args) + _nbytes(future.kwargs)
+        self._write(['task', round(started - self._origin, 6), round(duration, 6), _name(future.method),
+                     arg_bytes, future.exception is None])
+
+    def invoke(self, fn, started, duration):
+        self._write(['invoke', round(started - self._origin, 6), round(duration, 6), _name(fn)])
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def load_traffic(path):
+    """Return the header and the records of a recording, sorted by start time"""
+    with gzip.open(path, 'rt') as handle:
+        header = json.loads(handle.readline())
+        records = [json.loads(line) for line in handle]
+    records.sort(key=lambda record: record[1])
+    return header, records
+
+
+def _synthetic_work(duration, arg_bytes, busy):
+    """Stand in for a recorded task: allocate its arguments and take as long as it did"""
+    payload = bytearray(arg_bytes)  # noqa: F841
+    end = time.monotonic() + duration
+    if not busy:
+        time.sleep(duration)
+        return
+    while time.monotonic() < end and not threads.cancellation_requested():
+        pass
+
+
+class TrafficReplayer(QObject):
+    """
+    Replays a recording made by ``TrafficRecorder`` with synthetic workloads.
+
+    Every recorded task is started at its recorded time as a QThreadFuture that allocates as many bytes as its
+    arguments took and then runs for the recorded duration, and every recorded callback runs in the main thread for
+    its recorded duration. By default the workloads spin, holding the GIL like real Python code would; pass
+    ``busy=False`` to have tasks sleep instead.
+
+    Parameters
+    ----------
+    path : str
+        The recording
+    speed : float, optional
+        Replay speed relative to the recording
+    busy : bool, optional
+        Whether synthetic tasks spin rather than sleep
+    pool : ThreadPool, optional
+        Pool to run the synthetic tasks on
+    """
+    sigFinished = Signal()
+
+    def __init__(self, path, speed=1., busy=True, pool=None):
+        super(TrafficReplayer, self).__init__()
+        self.header, self.records = load_traffic(path)
+        self.speed = speed
+        self.busy = busy
+        self.pool = pool
+        self.elapsed = None
+        self.group = threads.TaskGroup(finished_slot=self._check_finished)
+        self._position = 0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._dispatch)
+
+    def start(self):
+        self._origin = time.monotonic()
+        self._dispatch()
+
+    def cancel(self):
+        self._timer.stop()
+        self._position = len(self.records)
+        self.group.cancel()
+
+    def _dispatch(self):
+        """Fire every record that is due, then wait for the next one"""
+        now = (time.monotonic() - self._origin) * self.speed
+        while self._position < len(self.records) and self.records[self._position][1] <= now:
+            record = self.records[self._position]
+            self._position += 1
+            duration = record[2] / self.speed
+            if record[0] == 'task':
+                future = threads.QThreadFuture(_synthetic_work, duration, record[4], self.busy, group=self.group,
+                                               showBusy=False, keepalive=False, pool=self.pool)
+                future.start()
+            else:
+                _synthetic_work(duration, 0, True)
+            now = (time.monotonic() - self._origin) * self.speed
+
+        if self._position < len(self.records):
+            delay = (self.records[self._position][1] - now) / self.speed
+            self._timer.start(max(0, int(delay * 1000)))
+        else:
+            self._check_finished()
+
+    def _check_finished(self):
+        if self._position == len(self.records) and self.group.done and self.elapsed is None:
+            self.elapsed = time.monotonic() - self._origin
+            self.sigFinished.emit()
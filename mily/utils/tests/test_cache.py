@@ -0,0 +1,106 @@
+import threading
+import time
+
+import numpy as np
+from qtpy.QtCore import QObject
+
+from mily.utils import threads
+from mily.utils.cache import DiskCache, stable_hash
+
+
+def test_stable_hash():
+    array = np.arange(10.)
+    assert stable_hash(array, a={'x': 1, 'y': 2}) == stable_hash(array.copy(), a={'y': 2, 'x': 1})
+    assert stable_hash(array) != stable_hash(array.astype(int))
+    assert stable_hash(array) != stable_hash(array.reshape(2, 5))
+    assert stable_hash({'a', 'b', 'c'}) == stable_hash({'c', 'b', 'a'}) != stable_hash(frozenset('abc'))
+
+
+def test_disk_cache_lru_and_integrity(tmp_path):
+    cache = DiskCache(str(tmp_path), max_size=3000)
+    for key in 'abc':
+        cache.put(key, np.zeros(100, dtype=np.uint8))
+    assert cache.lookup('a')[0]
+    cache.put('d', np.zeros(2500, dtype=np.uint8))
+    assert 'a' in cache and 'b' not in cache and 'c' not in cache
+
+    # entries survive a restart, and corrupt ones are discarded
+    with open(cache._path('a'), 'r+b') as handle:
+        handle.seek(-1, 2)
+        handle.write(b'!')
+    reopened = DiskCache(str(tmp_path), max_size=3000)
+    assert len(reopened) == 2
+    assert reopened.lookup('a') == (False, None)
+    hit, value = reopened.lookup('d')
+    assert hit and value.shape == (2500,)
+
+
+def test_method_cache_hit_skips_worker(tmp_path, qtbot, monkeypatch):
+    cache = DiskCache(str(tmp_path))
+    calls = []
+    results = []
+
+    def double(x):
+        calls.append(x)
+        return 2 * x
+
+    run = threads.method(callback_slot=results.append, showBusy=False, cache=cache)(double)
+    run(np.arange(3))
+    qtbot.waitUntil(lambda: len(results) == 1)
+
+    monkeypatch.setattr(threads.QThreadFuture, 'start', lambda self: 1 / 0)
+    run(np.arange(3))
+    qtbot.waitUntil(lambda: len(results) == 2)
+    assert len(calls) == 1
+    np.testing.assert_array_equal(results[1], [0, 2, 4])
+
+
+def test_method_cache_key(tmp_path, qtbot):
+    cache = DiskCache(str(tmp_path))
+    calls = []
+    results = []
+
+    class Processor(QObject):
+        def double(self, x):
+            calls.append(x)
+            return 2 * x
+
+    processor = Processor()
+    # a QObject cannot be pickled, so the call runs uncached
+    uncached = threads.method(callback_slot=results.append, showBusy=False, cache=cache)(Processor.double)
+    cached = threads.method(callback_slot=results.append, showBusy=False, cache=cache,
+                            cache_key=lambda self, x: x)(Processor.double)
+    for run, x in [(uncached, 1), (uncached, 1), (cached, 2), (cached, 2)]:
+        expected = len(results) + 1
+        run(processor, x)
+        qtbot.waitUntil(lambda: len(results) == expected)
+
+    assert calls == [1, 1, 2] and results == [2, 2, 4, 4]
+    assert len(cache) == 1
+
+
+def test_method_cache_hit_supersedes_threadkey(tmp_path, qtbot):
+    cache = DiskCache(str(tmp_path))
+    started = threading.Event()
+    results = []
+
+    def echo(x):
+        if x == 'slow':
+            started.set()
+            time.sleep(.2)
+        return x
+
+    group = threads.TaskGroup()
+    run = threads.method(callback_slot=results.append, showBusy=False, cache=cache, threadkey='echo',
+                         group=group)(echo)
+    run('fast')
+    qtbot.waitUntil(lambda: results == ['fast'])
+    run('slow')
+    assert started.wait(1.)
+    run('fast')
+    qtbot.waitUntil(lambda: len(results) == 3)
+
+    # the newest call is delivered last
+    assert results == ['fast', 'slow', 'fast']
+    assert group.total == 3
+    qtbot.waitUntil(lambda: group.done)
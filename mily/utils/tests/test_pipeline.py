@@ -0,0 +1,82 @@
+import functools
+import operator
+import threading
+
+import pytest
+
+from mily.utils.pipeline import Pipeline
+
+
+def test_pipeline_stages(qtbot):
+    results = []
+    pipeline = (Pipeline(range, 10, maxsize=2)
+                .map(lambda x: x * x)
+                .filter(lambda x: x % 2 == 0)
+                .batch(2))
+
+    finished = []
+    pipeline.start(callback_slot=results.append, finished_slot=lambda: finished.append(1), showBusy=False)
+    qtbot.waitUntil(lambda: bool(finished))
+
+    assert results == [[0, 4], [16, 36], [64]]
+    assert pipeline.wait(1000)
+
+
+def test_pipeline_propagates_exceptions(qtbot):
+    errors = []
+
+    def fail(x):
+        if x == 3:
+            raise ValueError(x)
+        return x
+
+    pipeline = Pipeline(range, 10).map(fail).map(str)
+    pipeline.start(except_slot=errors.append, showBusy=False)
+    qtbot.waitUntil(lambda: bool(errors))
+    assert isinstance(errors[0], ValueError)
+    assert pipeline.wait(1000)
+    with pytest.raises(ValueError):
+        pipeline.start()
+
+
+def test_pipeline_failure_stops_every_stage(qtbot):
+    errors = []
+    pipeline = Pipeline(range, 1000, maxsize=2).map(lambda x: 1 / 0)
+    pipeline.start(except_slot=errors.append, showBusy=False)
+    qtbot.waitUntil(lambda: bool(errors))
+    assert isinstance(errors[0], ZeroDivisionError)
+    # the source stage must not be left blocked on its full queue
+    assert pipeline.wait(2000)
+
+
+def test_pipeline_callable_stages(qtbot):
+    class Even:
+        def __call__(self, x):
+            return x % 2 == 0
+
+    results = []
+    finished = []
+    pipeline = Pipeline(range, 6).map(functools.partial(operator.mul, 3)).filter(Even())
+    pipeline.start(callback_slot=results.append, finished_slot=lambda: finished.append(1), showBusy=False)
+    qtbot.waitUntil(lambda: bool(finished))
+    assert results == [0, 6, 12]
+    assert pipeline.wait(1000)
+
+
+def test_pipeline_cancel_skips_finished_slot(qtbot):
+    release = threading.Event()
+    results, finished = [], []
+
+    def hold(x):
+        if x:
+            release.wait(1.)
+        return x
+
+    pipeline = Pipeline(range, 10, maxsize=2).map(hold)
+    pipeline.start(callback_slot=results.append, finished_slot=lambda: finished.append(1), showBusy=False)
+    qtbot.waitUntil(lambda: results == [0])
+    pipeline.cancel()
+    release.set()
+    assert pipeline.wait(2000)
+    qtbot.wait(50)
+    assert finished == [] and len(results) < 10
@@ -0,0 +1,28 @@
+import threading
+import time
+
+from mily.utils import threads
+from mily.utils.profiler import SamplingProfiler
+
+
+def busy_reduction(started):
+    started.set()
+    end = time.monotonic() + .2
+    while time.monotonic() < end:
+        sum(range(1000))
+
+
+def test_profiler_attributes_samples_to_method(qtbot, tmp_path):
+    started = threading.Event()
+    future = threads.QThreadFuture(busy_reduction, started, showBusy=False)
+
+    with SamplingProfiler(interval=.005) as profiler:
+        future.start()
+        assert started.wait(1.)
+        future.wait()
+
+    assert profiler.by_method()['busy_reduction'] > 0
+    path = tmp_path / 'stacks.txt'
+    profiler.dump_collapsed(str(path))
+    line = path.read_text().splitlines()[0]
+    assert line.startswith('busy_reduction;busy_reduction (test_profiler.py:')
@@ -0,0 +1,35 @@
+import time
+
+import numpy as np
+
+from mily.utils import threads
+from mily.utils.replay import TrafficRecorder, TrafficReplayer, load_traffic
+
+
+def reduce_frame(frame):
+    time.sleep(.02)
+    return frame.sum()
+
+
+def test_record_and_replay(qtbot, tmp_path):
+    path = str(tmp_path / 'session.jsonl.gz')
+    results = []
+
+    with TrafficRecorder(path):
+        future = threads.QThreadFuture(reduce_frame, np.zeros(1000), callback_slot=results.append,
+                                       showBusy=False)
+        future.start()
+        qtbot.waitUntil(lambda: len(results) == 1)
+        future.wait()
+
+    header, records = load_traffic(path)
+    assert header['version'] == 1
+    task, = [record for record in records if record[0] == 'task']
+    assert task[3] == 'reduce_frame' and task[4] >= 8000 and task[2] >= .02
+    assert any(record[0] == 'invoke' and record[3] == 'list.append' for record in records)
+
+    replayer = TrafficReplayer(path, speed=2.)
+    with qtbot.waitSignal(replayer.sigFinished, timeout=2000):
+        replayer.start()
+    assert replayer.group.total == 1
+    assert replayer.elapsed >= task[2] / 2
@@ -0,0 +1,312 @@
+import threading
+import time
+import traceback
+import weakref
+
+import numpy as np
+import pytest
+
+from mily.utils import threads
+
+
+@pytest.fixture
+def manager(monkeypatch, qapp):
+    manager = threads.ThreadManager()
+    monkeypatch.setattr(threads, 'manager', manager)
+    yield manager
+    for thread in list(manager._futures):
+        thread.wait()
+
+
+def test_shutdown_cancels_cooperative_and_queued(manager, qtbot):
+
+    started = threading.Event()
+
+    def cooperative():
+        started.set()
+        while not threads.cancellation_requested():
+            time.sleep(.01)
+
+    running = threads.QThreadFuture(cooperative, showBusy=False)
+    queued = threads.QThreadFuture(cooperative, showBusy=False)
+    running.start()
+    assert started.wait(1.)
+
+    stragglers = manager.shutdown(timeout=1.)
+
+    assert stragglers == []
+    assert running.cancel_requested and queued.cancelled
+    queued.start()
+    assert not queued.isRunning()
+
+
+def test_shutdown_reports_stragglers(manager, qtbot):
+    started = threading.Event()
+
+    def stubborn():
+        started.set()
+        time.sleep(.5)
+
+    future = threads.QThreadFuture(stubborn, showBusy=False)
+    future.start()
+    assert started.wait(1.)
+
+    start = time.monotonic()
+    stragglers = manager.shutdown(timeout=.05)
+
+    assert time.monotonic() - start < .4
+    assert stragglers == [future]
+    future.wait()
+
+
+def test_shutdown_finishes_unstarted(manager, qtbot):
+    group = threads.TaskGroup()
+    unstarted = threads.QThreadFuture(time.sleep, 0, group=group, showBusy=False)
+    late = threads.QThreadFuture(time.sleep, 0, group=group, showBusy=False)
+
+    with qtbot.waitSignal(group.sigFinished):
+        manager.shutdown(timeout=1.)
+        late.start()
+
+    assert unstarted.cancelled and late.cancelled
+    assert unstarted.result() is None and late.result() is None
+    assert group.done and group.cancelled == 2
+
+
+def test_invoke_channel_batches_calls(qtbot):
+    channel = threads.InvokeChannel()
+    received = []
+
+    def push():
+        for i in range(1000):
+            channel.put(received.append, i)
+
+    worker = threading.Thread(target=push)
+    worker.start()
+    worker.join()
+
+    qtbot.waitUntil(lambda: len(received) == 1000)
+    assert received == list(range(1000))
+    assert channel.depth == 0
+    assert channel.batches < 1000
+
+
+def test_pool_reuses_worker_resources(manager, qtbot):
+    initialized, finalized, opened, closed = [], [], [], []
+
+    def open_client():
+        opened.append(threading.get_ident())
+        return object()
+
+    pool = threads.ThreadPool(max_workers=2, initializer=initialized.append, initargs=(1,),
+                              finalizer=lambda: finalized.append(1))
+    pool.register_resource('client', open_client, close=closed.append)
+
+    clients = set()
+
+    def task():
+        clients.add(id(threads.resource('client')))
+
+    futures = [threads.QThreadFuture(task, pool=pool, showBusy=False) for _ in range(50)]
+    for future in futures:
+        future.start()
+    assert all(future.wait(1000) for future in futures)
+    assert all(future.done for future in futures)
+
+    assert pool.shutdown(timeout=1.)
+    assert len(initialized) == len(finalized) <= 2
+    assert len(opened) == len(closed) == len(clients) <= 2
+
+
+def test_pool_initializer_failure_fails_a_task(manager, qtbot):
+    attempts, finalized = [], []
+
+    def initialize():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError('no catalog')
+
+    pool = threads.ThreadPool(max_workers=1, initializer=initialize, finalizer=lambda: finalized.append(1))
+    errors = []
+    futures = [threads.QThreadFuture(abs, -i, pool=pool, except_slot=errors.append, showBusy=False)
+               for i in range(3)]
+    for future in futures:
+        future.start()
+    assert all(future.wait(1000) for future in futures)
+
+    assert isinstance(futures[0].exception, ConnectionError)
+    assert [future.result() for future in futures[1:]] == [(1,), (2,)]
+    qtbot.waitUntil(lambda: len(errors) == 1)
+    assert pool.shutdown(timeout=1.)
+    assert len(attempts) == 2 and len(finalized) == 1
+
+
+def test_pool_shrink_limits_idle_workers(manager, qtbot):
+    pool = threads.ThreadPool(max_workers=4)
+    barrier = threading.Barrier(4)
+    futures = [threads.QThreadFuture(barrier.wait, 1., pool=pool, showBusy=False) for _ in range(4)]
+    for future in futures:
+        future.start()
+    assert all(future.wait(1000) for future in futures)
+    qtbot.waitUntil(lambda: pool._idle == 4)
+
+    pool.set_max_workers(1)
+    lock = threading.Lock()
+    running, widths = [], []
+
+    def task():
+        with lock:
+            running.append(1)
+            widths.append(len(running))
+        time.sleep(.02)
+        with lock:
+            running.pop()
+
+    futures = [threads.QThreadFuture(task, pool=pool, showBusy=False) for _ in range(4)]
+    for future in futures:
+        future.start()
+    assert all(future.wait(1000) for future in futures)
+
+    assert widths == [1, 1, 1, 1]
+    assert pool.workers == 1
+    assert pool.shutdown(timeout=1.)
+
+
+def test_cancel_queued_pool_future(manager, qtbot):
+    release = threading.Event()
+    calls = []
+    pool = threads.ThreadPool(max_workers=1)
+    blocker = threads.QThreadFuture(release.wait, 1., pool=pool, showBusy=False)
+    queued = threads.QThreadFuture(calls.append, 1, pool=pool, showBusy=False)
+    blocker.start()
+    queued.start()
+
+    start = time.monotonic()
+    queued.cancel()
+    assert time.monotonic() - start < .5
+    assert queued.cancelled and not queued.isRunning() and queued.wait(0)
+
+    release.set()
+    after = threads.QThreadFuture(calls.append, 2, pool=pool, showBusy=False)
+    after.start()
+    assert after.wait(1000)
+    assert calls == [2]
+    assert pool.shutdown(timeout=1.)
+
+
+def test_task_group_progress_and_cancel(manager, qtbot):
+    progress = []
+    group = threads.TaskGroup(progress_slot=progress.append)
+    release = threading.Event()
+
+    def blocked():
+        while not release.is_set() and not threads.cancellation_requested():
+            time.sleep(.01)
+
+    pool = threads.ThreadPool(max_workers=2)
+    for _ in range(2):
+        threads.QThreadFuture(time.sleep, 0, pool=pool, group=group, showBusy=False)
+    for _ in range(8):
+        threads.QThreadFuture(blocked, pool=pool, group=group, showBusy=False)
+
+    with qtbot.waitSignal(group.sigFinished, timeout=2000):
+        group.start()
+        qtbot.waitUntil(lambda: group.finished >= 2)
+        group.cancel()
+
+    assert group.done and group.total == 10
+    assert group.cancelled >= 6
+    assert progress == sorted(progress) and progress[-1] == 100
+    pool.shutdown(timeout=1.)
+
+
+def test_task_group_finishes_when_pool_closes(manager, qtbot):
+    started, release = threading.Event(), threading.Event()
+
+    def blocked():
+        started.set()
+        release.wait(1.)
+
+    pool = threads.ThreadPool(max_workers=1)
+    threads.QThreadFuture(blocked, pool=pool, showBusy=False).start()
+    # the worker is busy, so the members stay queued until the pool closes
+    assert started.wait(1.)
+
+    finished, reported = [], []
+    # the slot runs in the main thread, where close() finishes the group
+    group = threads.TaskGroup(finished_slot=lambda: finished.append(group.cancel()))
+    futures = [threads.QThreadFuture(time.sleep, 0, pool=pool, group=group, progress_slot=reported.append,
+                                     showBusy=False) for _ in range(3)]
+    group.start()
+    pool.close()
+
+    assert group.done and group.cancelled == 3
+    assert finished == [None]
+    qtbot.waitUntil(lambda: not any(future.progress._timer.isActive() for future in futures))
+    release.set()
+    assert pool.join(1.)
+
+
+def test_progress_reporter_samples_latest_value(manager, qtbot):
+    received = []
+
+    def work(progress):
+        for i in range(1, 100001):
+            progress.report(i / 1000)
+
+    future = threads.QThreadFuture(work, progress_slot=received.append, progress_interval=10, showBusy=False)
+    with qtbot.waitSignal(future.progress.sigProgress, check_params_cb=lambda value: value == 100):
+        future.start()
+
+    assert received[-1] == 100
+    assert len(received) < 1000
+
+
+def test_progress_reporter_array_values(qtbot):
+    received = []
+    reporter = threads.ProgressReporter(received.append)
+    first = np.zeros(3)
+    for value in [first, first, np.ones(3), 1., np.float64(1.)]:
+        reporter.report(value)
+        reporter.sample()
+
+    assert len(received) == 3
+    assert received[0] is first and received[-1] == 1.
+
+
+def test_adaptive_tuner_adjusts_pool(manager, qapp, monkeypatch):
+    pool = threads.ThreadPool(max_workers=4)
+    tuner = threads.AdaptivePoolTuner(pool, target_latency=.05, max_workers=8)
+    monkeypatch.setattr(threads.ThreadPool, 'backlog', 1)
+
+    tuner.adjust(.01, 100.)
+    assert pool.max_workers == 5
+    tuner.adjust(.01, 50.)  # the extra worker made things slower
+    assert pool.max_workers == 4
+    tuner.adjust(.2, 100.)  # the GUI is lagging
+    assert pool.max_workers == 3
+
+    monkeypatch.setattr(threads.ThreadPool, 'backlog', 0)
+    tuner.adjust(.01, 100.)
+    assert pool.max_workers == 3
+
+
+def test_summarized_exception_releases_frames(manager, qtbot):
+    class Big:
+        pass
+
+    refs = []
+
+    def fail():
+        big = Big()
+        refs.append(weakref.ref(big))
+        raise ValueError('bad data')
+
+    errors = []
+    future = threads.QThreadFuture(fail, except_slot=errors.append, summarize_exceptions=True, showBusy=False)
+    future.start()
+    qtbot.waitUntil(lambda: bool(errors))
+
+    assert isinstance(future.exception, traceback.TracebackException)
+    assert 'ValueError: bad data' in ''.join(future.exception.format())
+    assert refs[0]() is None
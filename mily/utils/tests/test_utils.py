@@ -1,3 +1,5 @@
+import traceback
+
 from qtpy.QtWidgets import QMessageBox
 
 from mily.utils import raise_to_operator
@@ -15,3 +17,17 @@ def test_raise_to_operator_msg(monkeypatch, qtbot):
     qtbot.addWidget(exc_dialog)
     assert exc_dialog is not None
     assert 'ZeroDivisionError' in exc_dialog.text()
+
+
+def test_raise_to_operator_summary(monkeypatch, qtbot):
+
+    monkeypatch.setattr(QMessageBox, 'exec_', lambda x: 1)
+    try:
+        1/0
+    except ZeroDivisionError as exc:
+        summary = traceback.TracebackException.from_exception(exc)
+    exc_dialog = raise_to_operator(summary)
+
+    qtbot.addWidget(exc_dialog)
+    assert exc_dialog.text() == 'ZeroDivisionError: division by zero'
+    assert 'test_raise_to_operator_summary' in exc_dialog.detailedText()
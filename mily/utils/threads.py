@@ -1,7 +1,12 @@
 import time
+import queue
+import threading
+import traceback
+import weakref
+from collections import deque
 from functools import wraps
 import logging
-from qtpy.QtCore import Signal, QThread, QEvent, QCoreApplication, QObject
+from qtpy.QtCore import Qt, Signal, QThread, QEvent, QCoreApplication, QObject, QTimer
 from qtpy.QtWidgets import QApplication
 
 
@@ -24,6 +29,50 @@ def show_ready(*_):
     return None
 
 
+def summarize_exception(ex):
+    """
+    Convert an exception to a ``traceback.TracebackException`` and release its traceback frames.
+
+    The summary keeps the type, message and formatted stack of the exception, but not the frames themselves, so the
+    locals of every frame in the traceback (large arrays included) can be freed.
+    """
+    summary = traceback.TracebackException.from_exception(ex)
+    traceback.clear_frames(ex.__traceback__)
+    ex.__traceback__ = None
+    return summary
+
+
+_local = threading.local()
+_active = {}  # thread ident -> QThreadFuture currently running on it, see mily.utils.profiler
+_tracer = None
+
+
+def set_tracer(tracer):
+    """
+    Install an object to be told about every task and main-thread callback, see mily.utils.replay.
+
+    ``tracer.task(future, started, duration)`` is called on the worker thread after each QThreadFuture has run, and
+    ``tracer.invoke(fn, started, duration)`` in the main thread after each ``invoke_in_main_thread`` callback, with
+    times from ``time.monotonic``. Pass None to remove it.
+    """
+    global _tracer
+    _tracer = tracer
+
+
+def current_future():
+    """Return the QThreadFuture running on the calling thread, or None"""
+    return getattr(_local, 'future', None)
+
+
+def cancellation_requested():
+    """
+    Check if the task running on the calling thread has been asked to stop.
+    Long-running methods should poll this and return early when it is True.
+    """
+    future = current_future()
+    return future is not None and future.cancel_requested
+
+
 class ThreadManager(QObject):
     """
     A global thread manager that holds on to threads with 'keepalive'
@@ -31,9 +80,14 @@ class ThreadManager(QObject):
     # TODO: convert to QStandardItemModel
     sigStateChanged = Signal()
 
-    def __init__(self):
+    def __init__(self, shutdown_timeout=5.):
         super(ThreadManager, self).__init__()
         self._threads = []
+        self._futures = weakref.WeakSet()
+        self._pools = []
+        self._quit_connected = False
+        self.shutdown_timeout = shutdown_timeout
+        self.shutting_down = False
 
     @property
     def threads(self):
@@ -50,6 +104,72 @@ class ThreadManager(QObject):
         self._threads.append(thread)
         self.sigStateChanged.emit()
 
+    def register(self, thread):
+        """
+        Track a thread for shutdown, without holding on to it
+        """
+        self._futures.add(thread)
+        if not self._quit_connected:
+            QApplication.instance().aboutToQuit.connect(self.shutdown)
+            self._quit_connected = True
+
+    def register_pool(self, pool):
+        """
+        Hold on to a ThreadPool so that its workers are stopped on shutdown
+        """
+        self._pools.append(pool)
+
+    def shutdown(self, timeout=None):
+        """
+        Cancel all threads and wait for them to finish, within a global deadline.
+
+        Threads that have not been started yet are cancelled outright and no new threads will be started.
+        Running threads are asked to stop (see ``cancellation_requested``) all at once, and are then waited on
+        until ``timeout`` seconds have passed in total, so that shutdown time does not grow with the number of
+        threads.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Seconds to wait for running threads in total, defaults to ``self.shutdown_timeout``
+
+        Returns
+        -------
+        stragglers : list of QThreadFuture
+            Threads that were still running when the deadline passed
+        """
+        if timeout is None:
+            timeout = self.shutdown_timeout
+        self.shutting_down = True
+        threads = list(self._futures)
+
+        pools = list(self._pools)
+
+        for thread in threads:
+            thread.request_cancel()
+            if not (thread.isRunning() or thread.done or thread.exception):
+                thread.cancelled = True
+                thread._finish()
+        for pool in pools:
+            pool.close()
+
+        deadline = time.monotonic() + timeout
+        stragglers = []
+        for thread in threads:
+            remaining = max(0., deadline - time.monotonic())
+            if not thread.wait(int(remaining * 1000)):
+                stragglers.append(thread)
+            elif not thread.done and not thread.exception:
+                thread.cancelled = True
+        for pool in pools:
+            pool.join(max(0., deadline - time.monotonic()))
+
+        for thread in stragglers:
+            log(f'Thread still running at shutdown: '
+                f'Method: {getattr(thread.method, "__name__", "UNKNOWN")}', logging.WARNING)
+        self.sigStateChanged.emit()
+        return stragglers
+
 
 manager = ThreadManager()
 
@@ -61,12 +181,13 @@ class QThreadFuture(QThread):
     """
     sigCallback = Signal()
     sigFinished = Signal()
-    sigExcept = Signal(Exception)
+    sigExcept = Signal(object)  # the exception, or its TracebackException with summarize_exceptions
 
     def __init__(self, method, *args, callback_slot=None, finished_slot=None,
                  except_slot=None, default_exhandle=True, lock=None,
                  threadkey: str = None, showBusy=True, keepalive=True,
-                 priority=QThread.InheritPriority,
+                 priority=QThread.InheritPriority, pool=None, group=None,
+                 progress_slot=None, progress_interval=100, summarize_exceptions=False,
                  **kwargs):
         super(QThreadFuture, self).__init__()
 
@@ -83,39 +204,95 @@ class QThreadFuture(QThread):
             self.sigFinished.connect(finished_slot)
         if except_slot:
             self.sigExcept.connect(except_slot)
-        QApplication.instance().aboutToQuit.connect(self.quit)
         self.method = method
         self.args = args
         self.kwargs = kwargs
+        self.progress = None
+        if progress_slot:
+            self.progress = ProgressReporter(progress_slot, interval=progress_interval)
+            self.kwargs['progress'] = self.progress
 
         self.cancelled = False
+        self.cancel_requested = False
         self.running = False
         self.done = False
         self.exception = None
+        self._result = None
         self.purge = False
         self.thread = None
         self.priority = priority
         self.showBusy = showBusy
+        self.summarize_exceptions = summarize_exceptions
+        self.pool = pool
+        self._submitted = False
+        self._taken = False  # by a pool worker
+        self._withdrawn = False  # from the pool, by cancel()
+        self._finished = threading.Event()
+        self.group = group
+        if group is not None:
+            group.add(self)
 
+        manager.register(self)
         if keepalive:
             manager.append(self)
 
     def start(self):
         """
-        Starts the thread
+        Starts the thread, or submits it to ``self.pool`` if one was given
         """
         if self.running:
             raise ValueError('Thread could not be started; it is already running.')
-        super(QThreadFuture, self).start(self.priority)
+        if manager.shutting_down:
+            self.cancelled = True
+            self._finish()
+            return
+        self._finished.clear()
+        if self.progress is not None:
+            self.progress.start()
+        if self.pool is not None:
+            self._submitted = True
+            self._taken = self._withdrawn = False
+            self.pool.submit(self)
+        else:
+            super(QThreadFuture, self).start(self.priority)
+
+    def isRunning(self):
+        if self.pool is None:
+            return super(QThreadFuture, self).isRunning()
+        return self._submitted and not self._finished.is_set()
+
+    def wait(self, *args):
+        """
+        Wait for the thread to finish, optionally for at most ``msecs``. Returns False on timeout.
+        """
+        if self.pool is None:
+            return super(QThreadFuture, self).wait(*args)
+        if not self._submitted:
+            return True
+        timeout = args[0] / 1000 if args else None
+        return self._finished.wait(timeout)
 
     def run(self, *args, **kwargs):
         """
         Do not call this from the main thread; you're probably looking for start()
+
+        The exception is a method that returns at once, such as the stand-in for a cached result used by
+        ``method``, which may be run in place in any thread.
         """
         self.cancelled = False
         self.running = True
         self.done = False
         self.exception = None
+        if self.cancel_requested:
+            self.running = False
+            self.cancelled = True
+            self._finish()
+            return
+        # run in place from another future's method, restore it afterwards
+        outer = current_future()
+        _local.future = self
+        _active[threading.get_ident()] = self
+        started = time.monotonic()
         if self.showBusy:
             invoke_in_main_thread(show_busy)
         try:
@@ -127,35 +304,574 @@ class QThreadFuture(QThread):
                 self.running = False
 
         except Exception as ex:
-            self.exception = ex
-            self.sigExcept.emit(ex)
-            log(logging.ERROR, f'Error in thread: '
-                               f'Method: {getattr(self.method, "__name__", "UNKNOWN")}\n'
-                               f'Args: {self.args}\n'
-                               f'Kwargs: {self.kwargs}')
+            ex = self._fail(ex)
+            log(f'Error in thread: '
+                f'Method: {getattr(self.method, "__name__", "UNKNOWN")}\n'
+                f'Args: {self.args}\n'
+                f'Kwargs: {self.kwargs}', logging.ERROR)
             log_error(ex)
         else:
             self.done = True
             self.sigFinished.emit()
         finally:
+            _local.future = outer
+            if outer is None:
+                _active.pop(threading.get_ident(), None)
+            else:
+                _active[threading.get_ident()] = outer
+            if _tracer is not None:
+                _tracer.task(self, started, time.monotonic() - started)
+            self._finish()
             invoke_in_main_thread(show_ready)
 
+    def _fail(self, ex):
+        """Record ``ex`` as the exception of the thread and emit it; returns what was recorded"""
+        if self.summarize_exceptions:
+            ex = summarize_exception(ex)
+        self.exception = ex
+        self.sigExcept.emit(ex)
+        return ex
+
+    def _finish(self):
+        """Notify everything waiting on this thread that it has stopped"""
+        self._finished.set()
+        if self.group is not None:
+            self.group._member_finished(self)
+        if self.progress is not None:
+            invoke_in_main_thread(self.progress.stop)
+
     def _run(self, *args, **kwargs):  # Used to generalize to QThreadFutureIterator
         yield self.method(*self.args, **self.kwargs)
 
     def result(self):
-        while not self.done and not self.exception:
+        """
+        Wait for the thread to stop and return its result, the exception it raised, or None if it was cancelled
+        """
+        while not self.done and not self.exception and not self.cancelled:
             time.sleep(.1)
         if self.exception:
             return self.exception
         return self._result
 
+    def request_cancel(self):
+        """
+        Ask the thread to stop without waiting for it; the method sees this through ``cancellation_requested``
+        """
+        self.cancel_requested = True
+        self.requestInterruption()
+
     def cancel(self):
+        """
+        Cancel the thread, waiting for it to stop if it is running; a future still queued on its pool is finished
+        at once and skipped by the pool
+        """
+        self.request_cancel()
+        if self.pool is not None and self._submitted and self.pool._withdraw(self):
+            self.cancelled = True
+            self._finish()
+            return
         self.quit()
         self.wait()
         self.cancelled = True
 
 
+class _PoolWorker(QThread):
+    """
+    A long-lived thread running tasks for a ThreadPool
+    """
+
+    def __init__(self, pool):
+        super(_PoolWorker, self).__init__()
+        self.pool = pool
+
+    def run(self):
+        self.pool._work()
+
+
+class ThreadPool(QObject):
+    """
+    A set of long-lived worker threads that run QThreadFutures submitted with ``pool=``.
+
+    Workers are started on demand, up to ``max_workers``, and each runs ``initializer`` once when it starts and
+    ``finalizer`` once when it stops. Expensive per-thread objects, such as catalog connections or file handles,
+    can be registered with ``register_resource``; each worker creates its own instance on first use through
+    ``resource`` and reuses it for every task it runs, closing it when the worker stops.
+
+    A worker whose ``initializer`` raises fails the next task with the error and stops without running
+    ``finalizer``; a new worker tries again for the tasks after it.
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        Maximum number of worker threads, defaults to ``QThread.idealThreadCount()``
+    initializer : callable, optional
+        Called with ``*initargs`` on each worker thread before it runs any task
+    initargs : tuple, optional
+        Arguments for ``initializer``
+    finalizer : callable, optional
+        Called on each worker thread after its last task
+    """
+
+    def __init__(self, max_workers=None, initializer=None, initargs=(), finalizer=None):
+        super(ThreadPool, self).__init__()
+        self.max_workers = max_workers or QThread.idealThreadCount()
+        self.initializer = initializer
+        self.initargs = initargs
+        self.finalizer = finalizer
+        self.closed = False
+        self._tasks = queue.Queue()
+        self._workers = []
+        self._alive = 0
+        self._idle = 0
+        self.completed = 0
+        self._lock = threading.Lock()
+        self._resources = {}
+        self._local = threading.local()
+        manager.register_pool(self)
+
+    def register_resource(self, name, factory, close=None):
+        """
+        Register a per-worker resource created by ``factory()``, and released by ``close(resource)`` if given
+        """
+        self._resources[name] = (factory, close)
+
+    def resource(self, name):
+        """
+        Return the calling worker's instance of the resource ``name``, creating it on first use
+        """
+        resources = getattr(self._local, 'resources', None)
+        if resources is None:
+            raise RuntimeError(f'Resource {name!r} is only available on the worker threads of its pool')
+        try:
+            return resources[name]
+        except KeyError:
+            factory, _ = self._resources[name]
+            resources[name] = factory()
+            return resources[name]
+
+    def submit(self, future):
+        """
+        Queue a QThreadFuture to run on one of the workers
+        """
+        if self.closed:
+            future.cancelled = True
+            future._finish()
+            return
+        self._tasks.put(future)
+        self._spawn()
+
+    @property
+    def workers(self):
+        """Number of worker threads currently alive"""
+        return self._alive
+
+    @property
+    def backlog(self):
+        """Number of tasks waiting for a worker"""
+        return self._tasks.qsize()
+
+    def set_max_workers(self, max_workers):
+        """
+        Change the maximum number of workers; surplus workers stop after their current task, or when they next
+        take a task, which they hand back to the queue
+        """
+        self.max_workers = max(1, max_workers)
+        self._spawn()
+
+    def _spawn(self):
+        """Start workers while there is queued work for them and the limit allows"""
+        while True:
+            with self._lock:
+                spawn = (not self.closed and self._alive < self.max_workers
+                         and self._tasks.qsize() > self._idle)
+                if spawn:
+                    self._alive += 1
+                    # workers whose initializer failed spawn their replacement from their own thread
+                    self._workers = [worker for worker in self._workers if not worker.isFinished()]
+                    worker = _PoolWorker(self)
+                    self._workers.append(worker)
+            if not spawn:
+                return
+            worker.start()
+
+    def _work(self):
+        self._local.resources = {}
+        retired = False
+        initialized = False
+        try:
+            try:
+                if self.initializer:
+                    self.initializer(*self.initargs)
+                initialized = True
+            except Exception as ex:
+                log('ThreadPool worker could not be initialized.', level=logging.ERROR)
+                log_error(ex)
+                self._fail_next(ex)
+                return
+            while True:
+                with self._lock:
+                    self._idle += 1
+                future = self._tasks.get()
+                with self._lock:
+                    self._idle -= 1
+                if future is None:
+                    break
+                with self._lock:
+                    if future._withdrawn:
+                        continue
+                    retired = self._alive > self.max_workers
+                    if retired:
+                        self._alive -= 1
+                    else:
+                        future._taken = True
+                if retired:
+                    self._tasks.put(future)
+                    break
+                future.run()
+                with self._lock:
+                    self.completed += 1
+                    if self._alive > self.max_workers:
+                        self._alive -= 1
+                        retired = True
+                        break
+        except Exception as ex:
+            log('ThreadPool worker failed.', level=logging.ERROR)
+            log_error(ex)
+        finally:
+            self._release(finalize=initialized)
+            if not retired:
+                with self._lock:
+                    self._alive -= 1
+            if not initialized:
+                # the next worker tries again, for the next task
+                self._spawn()
+
+    def _fail_next(self, ex):
+        """Fail the next queued task with ``ex``, the error initializing the worker taking it"""
+        while True:
+            with self._lock:
+                self._idle += 1
+            future = self._tasks.get()
+            with self._lock:
+                self._idle -= 1
+                if future is None:
+                    return
+                if future._withdrawn:
+                    continue
+                future._taken = True
+            future._fail(ex)
+            future._finish()
+            with self._lock:
+                self.completed += 1
+            return
+
+    def _withdraw(self, future):
+        """Stop a queued future from being run; returns False if a worker has already taken it"""
+        with self._lock:
+            if future._taken:
+                return False
+            future._withdrawn = True
+            return True
+
+    def _release(self, finalize=True):
+        """Run the finalizer, if ``finalize``, and close this worker's resources"""
+        try:
+            if finalize and self.finalizer:
+                self.finalizer()
+        except Exception as ex:
+            log('ThreadPool finalizer failed.', level=logging.ERROR)
+            log_error(ex)
+        resources = self._local.resources
+        for name in reversed(list(resources)):
+            close = self._resources[name][1]
+            if close:
+                try:
+                    close(resources[name])
+                except Exception as ex:
+                    log(f'ThreadPool resource {name!r} could not be closed.', level=logging.ERROR)
+                    log_error(ex)
+        self._local.resources = None
+
+    def close(self):
+        """
+        Cancel all queued tasks and tell the workers to stop once their current task is done
+        """
+        self.closed = True
+        while True:
+            try:
+                future = self._tasks.get_nowait()
+            except queue.Empty:
+                break
+            if future is not None:
+                future.request_cancel()
+                future.cancelled = True
+                future._finish()
+        for _ in range(len(self._workers)):
+            self._tasks.put(None)
+
+    def join(self, timeout=None):
+        """
+        Wait for the workers to stop, for at most ``timeout`` seconds in total. Returns False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for worker in self._workers:
+            if deadline is None:
+                worker.wait()
+            elif not worker.wait(int(max(0., deadline - time.monotonic()) * 1000)):
+                return False
+        return True
+
+    def shutdown(self, timeout=None):
+        """
+        Close the pool and wait for its workers to stop
+        """
+        self.close()
+        return self.join(timeout)
+
+
+class AdaptivePoolTuner(QObject):
+    """
+    Grows or shrinks a ThreadPool to keep the GUI responsive while maximizing throughput.
+
+    More workers are not always faster in a Qt application, because their GIL contention delays the event loop.
+    A timer in the main thread fires every ``interval`` milliseconds, and how late it runs measures the main-loop
+    latency. After every ``window`` ticks the worst latency and the task throughput of the pool are compared: if
+    the latency is above ``target_latency`` the pool is shrunk by a quarter, otherwise if tasks are waiting one
+    worker is added, unless the previous increase lowered the throughput, in which case it is undone.
+
+    Parameters
+    ----------
+    pool : ThreadPool
+        The pool to tune
+    target_latency : float, optional
+        Worst acceptable main-loop latency in seconds
+    min_workers, max_workers : int, optional
+        Bounds on the number of workers, ``max_workers`` defaults to twice ``QThread.idealThreadCount()``
+    interval : int, optional
+        Milliseconds between latency probes
+    window : int, optional
+        Number of probes between adjustments
+    """
+    sigAdjusted = Signal(int)
+
+    def __init__(self, pool, target_latency=.05, min_workers=1, max_workers=None, interval=20, window=10):
+        super(AdaptivePoolTuner, self).__init__()
+        self.pool = pool
+        self.target_latency = target_latency
+        self.min_workers = min_workers
+        self.max_workers = max_workers or 2 * QThread.idealThreadCount()
+        self.interval = interval
+        self.window = window
+        self.latency = 0.
+        self.throughput = 0.
+        self._last_throughput = None
+        self._grew = False
+        self._ticks = 0
+        self._max_latency = 0.
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self._tick)
+
+    def start(self):
+        self._due = time.monotonic() + self.interval / 1000
+        self._window_start = time.monotonic()
+        self._completed = self.pool.completed
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+
+    def _tick(self):
+        now = time.monotonic()
+        self._max_latency = max(self._max_latency, now - self._due)
+        self._due = now + self.interval / 1000
+        self._ticks += 1
+        if self._ticks < self.window:
+            return
+        elapsed = now - self._window_start
+        completed = self.pool.completed
+        self.adjust(self._max_latency, (completed - self._completed) / elapsed if elapsed else 0.)
+        self._ticks = 0
+        self._max_latency = 0.
+        self._window_start = now
+        self._completed = completed
+
+    def adjust(self, latency, throughput):
+        """
+        Resize the pool given the worst main-loop latency and the throughput (tasks/s) over the last window
+        """
+        self.latency = latency
+        self.throughput = throughput
+        workers = self.pool.max_workers
+        if latency > self.target_latency:
+            target = workers - max(1, workers // 4)
+        elif self._grew and self._last_throughput and throughput < .95 * self._last_throughput:
+            target = workers - 1
+        elif self.pool.backlog:
+            target = workers + 1
+        else:
+            target = workers
+        target = min(self.max_workers, max(self.min_workers, target))
+
+        self._grew = target > workers
+        self._last_throughput = throughput
+        if target != workers:
+            self.pool.set_max_workers(target)
+            self.sigAdjusted.emit(target)
+
+
+def resource(name):
+    """
+    Return the calling worker's instance of a resource registered on the ThreadPool running the current task
+    """
+    future = current_future()
+    if future is None or future.pool is None:
+        raise RuntimeError(f'Resource {name!r} is only available to tasks running on a ThreadPool')
+    return future.pool.resource(name)
+
+
+class ProgressReporter(QObject):
+    """
+    A latest-value progress channel from a worker to the GUI, separate from result callbacks.
+
+    The worker calls ``report(value)``, which only stores the value. A timer in the main thread samples it every
+    ``interval`` milliseconds and emits ``sigProgress`` when it has changed, so reporting costs the worker nothing
+    and the GUI is updated at a fixed rate however often progress is reported. Values that cannot be compared as
+    a whole, such as NumPy arrays, are emitted whenever a new object is reported.
+
+    A QThreadFuture given a ``progress_slot`` creates one and passes it to its method as the ``progress`` keyword
+    argument.
+    """
+    sigProgress = Signal(object)
+
+    def __init__(self, progress_slot=None, interval=100):
+        super(ProgressReporter, self).__init__()
+        if progress_slot:
+            self.sigProgress.connect(progress_slot)
+        self.value = None
+        self._emitted = None
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self.sample)
+
+    def report(self, value):
+        """
+        Record the latest progress; safe to call from any thread
+        """
+        self.value = value
+
+    def sample(self):
+        """
+        Emit the latest progress if it has changed since the last sample
+        """
+        value = self.value
+        if value is None or value is self._emitted:
+            return
+        try:
+            changed = bool(value != self._emitted)
+        except (TypeError, ValueError):  # such as NumPy arrays, whose comparison is ambiguous
+            changed = True
+        if changed:
+            self._emitted = value
+            self.sigProgress.emit(value)
+
+    def start(self):
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+        self.sample()
+
+
+class TaskGroup(QObject):
+    """
+    Tracks a set of related QThreadFutures as a unit.
+
+    Members are added by passing ``group=`` to a QThreadFuture (or to ``method``). Their completion is counted on
+    the worker threads, so the group only signals the GUI when its overall percentage changes and once when every
+    member has finished, whatever the number of members. Add all members before starting them, otherwise the group
+    may finish early.
+    """
+    sigProgress = Signal(int)
+    sigFinished = Signal()
+
+    def __init__(self, progress_slot=None, finished_slot=None):
+        super(TaskGroup, self).__init__()
+        if progress_slot:
+            self.sigProgress.connect(progress_slot)
+        if finished_slot:
+            self.sigFinished.connect(finished_slot)
+        self.members = []
+        self._pending = set()
+        self._lock = threading.Lock()
+        # serializes the signals so that progress arrives in order; reentrant for slots that call back in
+        self._emit_lock = threading.RLock()
+        self._percent = 0
+        self.finished = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    def add(self, future):
+        """
+        Add a QThreadFuture to the group
+        """
+        future.group = self
+        with self._lock:
+            self.members.append(future)
+            self._pending.add(future)
+
+    @property
+    def total(self):
+        return len(self.members)
+
+    @property
+    def progress(self):
+        """Fraction of the members that have finished, in any way"""
+        return self.finished / self.total if self.members else 1.
+
+    @property
+    def done(self):
+        return not self._pending
+
+    def _member_finished(self, future):
+        with self._lock:
+            if future not in self._pending:
+                return
+            self._pending.remove(future)
+            self.finished += 1
+            if future.exception:
+                self.failed += 1
+            elif future.cancelled:
+                self.cancelled += 1
+            percent = 100 * self.finished // len(self.members)
+            last = not self._pending
+        # emit outside of the lock, so that slots can add or cancel members
+        with self._emit_lock:
+            if percent > self._percent:
+                self._percent = percent
+                self.sigProgress.emit(percent)
+            if last:
+                self.sigFinished.emit()
+
+    def start(self):
+        """
+        Start every member
+        """
+        for future in list(self.members):
+            future.start()
+
+    def cancel(self):
+        """
+        Cancel the members that have not started, and ask the running ones to stop; does not block
+        """
+        for future in list(self.members):
+            future.request_cancel()
+            if not (future.isRunning() or future.isFinished() or future.done or future.exception):
+                future.cancelled = True
+                self._member_finished(future)
+
+
 class QThreadFutureIterator(QThreadFuture):
     """
     Same as QThreadFuture, but emits to the callback_slot for every yielded value of a generator
@@ -180,6 +896,7 @@ class InvokeEvent(QEvent):
 
 class Invoker(QObject):
     def event(self, event):
+        started = time.monotonic() if _tracer is not None else None
         try:
             if hasattr(event.fn, 'signal'):  # check if invoking a signal or a callable
                 event.fn.emit(*event.args, *event.kwargs.values())
@@ -189,6 +906,9 @@ class Invoker(QObject):
         except Exception as ex:
             log('QThreadFuture callback could not be invoked.', level=logging.ERROR)
             log_error(ex)
+        finally:
+            if started is not None and _tracer is not None:
+                _tracer.invoke(event.fn, started, time.monotonic() - started)
         return False
 
 
@@ -203,8 +923,81 @@ def invoke_in_main_thread(fn, *args, **kwargs):
                                InvokeEvent(fn, *args, **kwargs))
 
 
+class DrainEvent(QEvent):
+    """
+    Wake-up event telling an InvokeChannel to run its pending calls
+    """
+    EVENT_TYPE = QEvent.Type(QEvent.registerEventType())
+
+    def __init__(self):
+        QEvent.__init__(self, DrainEvent.EVENT_TYPE)
+
+
+class InvokeChannel(QObject):
+    """
+    A batched alternative to ``invoke_in_main_thread`` for high-rate callers.
+
+    Calls are appended to a deque from any thread, and only the first call after a drain posts an event. When the
+    event is handled in the main thread, every call queued up to that point is run, so the Qt overhead is paid
+    once per batch rather than once per call. ``depth`` and ``max_depth`` give the current and peak queue length.
+    """
+
+    def __init__(self, parent=None):
+        super(InvokeChannel, self).__init__(parent)
+        self._queue = deque()
+        self._wake_pending = False
+        self.max_depth = 0
+        self.calls = 0
+        self.batches = 0
+
+    @property
+    def depth(self):
+        return len(self._queue)
+
+    def put(self, fn, *args):
+        """
+        Queue ``fn(*args)`` to run in the main thread; safe to call from any thread
+        """
+        self._queue.append((fn, args))
+        if not self._wake_pending:
+            self._wake_pending = True
+            QCoreApplication.postEvent(self, DrainEvent())
+
+    def event(self, event):
+        if event.type() != DrainEvent.EVENT_TYPE:
+            return super(InvokeChannel, self).event(event)
+        # Clear the flag before draining, so that anything queued from here on posts a new event
+        self._wake_pending = False
+        depth = len(self._queue)
+        self.max_depth = max(self.max_depth, depth)
+        popleft = self._queue.popleft
+        for _ in range(depth):
+            fn, args = popleft()
+            try:
+                fn(*args)
+            except Exception as ex:
+                log('InvokeChannel callback could not be invoked.', level=logging.ERROR)
+                log_error(ex)
+        self.calls += depth
+        self.batches += 1
+        return True
+
+
+_channel = InvokeChannel()
+
+
+def invoke_batched_in_main_thread(fn, *args):
+    """
+    Invoke a callable in the main thread through the shared InvokeChannel. Use this instead of
+    invoke_in_main_thread for high-rate callbacks; signals should be passed as ``signal.emit``.
+    """
+    _channel.put(fn, *args)
+
+
 def method(callback_slot=None, finished_slot=None, except_slot=None, default_exhandle=True, lock=None,
-           threadkey: str = None, showBusy=True, priority=QThread.InheritPriority, keepalive=True, ):
+           threadkey: str = None, showBusy=True, priority=QThread.InheritPriority, keepalive=True,
+           cache=None, cache_key=None, pool=None, group=None, progress_slot=None, progress_interval=100,
+           summarize_exceptions=False):
     """
     Decorator for functions/methods to run as RunnableMethods on background QT threads
     Use it as any python decorator to decorate a function with @decorator syntax or at runtime:
@@ -222,6 +1015,25 @@ def method(callback_slot=None, finished_slot=None, except_slot=None, default_exh
         Flag to use the default exception handle slot. If false it will not be called
     lock : mutex/semaphore
         Simple lock if multiple access needs to be prevented
+    cache : mily.utils.cache.DiskCache, optional
+        Cache to memoize results in, keyed by the function and its arguments. On a hit the slots are invoked with
+        the cached result and no thread is started; the call still supersedes the threads with the same
+        ``threadkey`` and counts towards its ``group``. Calls whose arguments cannot be hashed run uncached.
+    cache_key : function, optional
+        Called with the arguments of each call, returns the value to key the cache with instead of the arguments;
+        for example ``lambda self, x: x`` for a method whose instance does not affect the result
+    pool : ThreadPool, optional
+        Pool to run the function on, instead of starting a new thread for each call
+    group : TaskGroup, optional
+        Group to add each call to
+    progress_slot : function, optional
+        Slot to receive progress reported through the ``progress`` keyword argument passed to the function, see
+        ProgressReporter
+    progress_interval : int, optional
+        Milliseconds between progress updates to ``progress_slot``
+    summarize_exceptions : bool, optional
+        Store and emit exceptions as ``traceback.TracebackException`` summaries, releasing the traceback frames and
+        their locals, see ``summarize_exception``
     Returns
     -------
     wrap_runnable_method : function
@@ -231,13 +1043,60 @@ def method(callback_slot=None, finished_slot=None, except_slot=None, default_exh
     def wrap_runnable_method(func):
         @wraps(func)
         def _runnable_method(*args, **kwargs):
-            future = QThreadFuture(func, *args,
+            target = func
+            hit = False
+            if cache is not None:
+                try:
+                    if cache_key is None:
+                        key = cache.key(func, *args, **kwargs)
+                    else:
+                        key = cache.key(func, cache_key(*args, **kwargs))
+                except Exception as ex:
+                    log(f'Arguments of {getattr(func, "__name__", "UNKNOWN")} could not be hashed, '
+                        f'running uncached: {ex}', logging.WARNING)
+                else:
+                    hit, result = cache.lookup(key)
+                    target = _returning(func, result) if hit else _caching(func, cache, key)
+
+            future = QThreadFuture(target, *args,
                                    callback_slot=callback_slot, finished_slot=finished_slot,
                                    except_slot=except_slot, default_exhandle=default_exhandle, lock=lock,
                                    threadkey=threadkey, showBusy=showBusy, priority=priority, keepalive=keepalive,
-                                   **kwargs)
-            future.start()
+                                   pool=pool, group=group, progress_slot=progress_slot,
+                                   progress_interval=progress_interval,
+                                   summarize_exceptions=summarize_exceptions, **kwargs)
+            if hit:
+                # a cached result needs no thread, but is delivered through a future like any other call, which
+                # supersedes the threads with the same threadkey and counts towards the group
+                future.run()
+            else:
+                future.start()
 
         return _runnable_method
 
     return wrap_runnable_method
+
+
+def _caching(func, cache, key):
+    """Wrap ``func`` to store its result in ``cache`` under ``key``"""
+
+    @wraps(func)
+    def _cached_method(*args, **kwargs):
+        result = func(*args, **kwargs)
+        try:
+            cache.put(key, result)
+        except Exception as ex:
+            log(f'Result of {getattr(func, "__name__", "UNKNOWN")} could not be cached: {ex}', logging.WARNING)
+        return result
+
+    return _cached_method
+
+
+def _returning(func, result):
+    """Stand in for ``func``, returning its cached ``result``"""
+
+    @wraps(func)
+    def _cached_result(*args, **kwargs):
+        return result
+
+    return _cached_result
@@ -65,21 +65,29 @@ def raise_to_operator(exc, execute=True):
 
     Parameters
     ----------
-    exc: Exception
+    exc: Exception or traceback.TracebackException
+        The exception, or a summary of it such as those emitted by
+        ``QThreadFuture`` with ``summarize_exceptions``
 
     execute: bool, optional
         Whether to execute the QMessageBox
     """
+    if isinstance(exc, traceback.TracebackException):
+        name = exc.exc_type.__name__
+        details = ''.join(exc.stack.format())
+    else:
+        name = type(exc).__name__
+        with io.StringIO() as handle:
+            traceback.print_tb(exc.__traceback__, file=handle)
+            handle.seek(0)
+            details = handle.read()
     # Assemble QMessageBox with Exception details
     err_msg = QMessageBox()
-    err_msg.setText(f'{exc.__class__.__name__}: {exc}')
-    err_msg.setWindowTitle(type(exc).__name__)
+    err_msg.setText(f'{name}: {exc}')
+    err_msg.setWindowTitle(name)
     err_msg.setIcon(QMessageBox.Critical)
     # Format traceback as detailed text
-    with io.StringIO() as handle:
-        traceback.print_tb(exc.__traceback__, file=handle)
-        handle.seek(0)
-        err_msg.setDetailedText(handle.read())
+    err_msg.setDetailedText(details)
     if execute:
         # Execute
         err_msg.exec_()
@@ -1,6 +1,11 @@
 from .table_interface import (  # noqa: F401
     MTableItemDelegate, MTableInterfaceView, MTableInterfaceWidget,
     MFunctionTableInterfaceWidget)
+from .table_model import (  # noqa: F401
+    MStandardItemModel, MColumnarTableModel)
+from .table_schema import MTableSchema  # noqa: F401
+from .table_undo import MTableUndoStack  # noqa: F401
+from .table_queue import MExecutionQueue  # noqa: F401
 
 from .widgets import (  # noqa: F401
     MText, MISpin, MFSpin, MComboBox, MCheckBox, MSelector, MDateTime)
@@ -1,10 +1,35 @@
 from collections import OrderedDict
-from qtpy.QtGui import QStandardItemModel, QStandardItem
-from qtpy.QtCore import Qt
+import numpy as np
+from qtpy.QtGui import QDrag, QKeySequence, QStandardItem
+from qtpy.QtCore import (Qt, QTimer, QMimeData, QModelIndex, QItemSelection,
+                         QItemSelectionModel, Signal)
 from qtpy.QtWidgets import (QTableView, QWidget, QLabel, QStyledItemDelegate,
                             QHBoxLayout, QVBoxLayout, QMessageBox,
-                            QPushButton)
-from .widgets import MText, vstacked_label
+                            QPushButton, QAbstractItemView, QShortcut)
+from .widgets import vstacked_label
+from .table_model import (MStandardItemModel, _as_array, _changed_rows,
+                          _column_length, _column_list, _python_value)
+from .table_io import read_table, write_table
+from .table_schema import MTableSchema
+from .table_undo import MTableUndoStack
+from .table_queue import MExecutionQueue
+
+
+def _display_key(value):
+    """Returns a hashable key identifying ``value`` for display purposes.
+
+    The type is part of the key so that, for example, ``1``, ``1.0`` and
+    ``True`` are displayed differently. Lists and dicts are converted to
+    tuples, which raises a ``TypeError`` if they hold unhashable values.
+    """
+    if isinstance(value, list):
+        return (list, tuple(_display_key(item) for item in value))
+    if isinstance(value, dict):
+        return (dict, tuple((_display_key(key), _display_key(val))
+                            for key, val in value.items()))
+    key = (type(value), value)
+    hash(key)
+    return key
 
 
 class MTableItemDelegate(QStyledItemDelegate):
@@ -17,15 +42,44 @@ class MTableItemDelegate(QStyledItemDelegate):
     maps the column names to editor widgets. It also has a custom method for
     ``self.createEditor`` that uses ``self.editor_map`` and returns the
     correct editor on request. If editor_map is empty it uses an ``MText``
-    widget for all columns. It also enforces the inclusion of a parent
+    widget for all columns. The columns are looked up in ``self.schema``, an
+    ``MTableSchema`` built from editor_map unless one is passed in using the
+    ``schema`` kwarg. It also enforces the inclusion of a parent
     attribute (something that is optional in the ``QStyledItemDelegate``) and
     adds an ``_name`` attribute for consistency with the `mily.widgets`` API.
     """
 
-    def __init__(self, parent, name, *args, editor_map={}, **kwargs):
+    def __init__(self, parent, name, *args, editor_map={}, schema=None,
+                 **kwargs):
         self._name = name
         super().__init__(*args, parent=parent, **kwargs)
         self.editor_map = editor_map
+        self.schema = schema if schema is not None else MTableSchema(
+            editor_map)
+        self._display_cache = {}
+
+    #: maps value types to functions returning their display text, these
+    #: are used instead of the generic search for a display string.
+    formatters = {str: str, int: str, float: str, bool: str, type(None): str}
+    #: the maximum number of display strings to cache.
+    display_cache_size = 10000
+
+    @classmethod
+    def register_formatter(cls, value_type, formatter):
+        """Registers ``formatter`` for displaying values of ``value_type``.
+
+        ``formatter`` is called with the value and should return a str. Only
+        the exact type is matched, subclasses are not.
+        """
+        cls.formatters = {**cls.formatters, value_type: formatter}
+
+    def clear_display_cache(self, *args):
+        """Empties the cache of display strings.
+
+        This is connected to the ``dataChanged`` and ``modelReset`` signals of
+        the model by ``MTableInterfaceView``.
+        """
+        self._display_cache.clear()
 
     def displayText(self, value, locale):
         """Converts the value of the editor to a display string.
@@ -34,41 +88,57 @@ class MTableItemDelegate(QStyledItemDelegate):
         and updates the associated TableView with the returned str_val for
         display. It is written such that it will find the best str to associate
         with the object, and will recursively change dict and list keys/items.
+        The strings are cached by value, so each value is only converted once
+        between changes to the model.
         """
-
-        def _get_display_str(value):
-            """Recursively find a list of attr names for a DisplayText.
-
-            This checks a number of attr names to see if any are present and
-            can be used to give a displayText value. Otherwise it returns the
-            str generated using ``str(value)``. It will recursively search
-            ``dict`` and ``list`` values and return str(dict) or str(list)
-            after setting displayText's for each key+value (for dicts) or item
-            (for lists).
-            """
-            if isinstance(value, list):  # recursively treat lists
-                list_val = []
-                for item in value:
-                    list_val.append(_get_display_str(item))
-                str_val = str(list_val).replace('"', '').replace("'", "")
-            elif isinstance(value, dict):  # recursively treat dicts
-                dict_val = {}
-                for key, val in value.items():
-                    dict_val[_get_display_str(key)] = _get_display_str(val)
-                str_val = str(dict_val).replace('"', '').replace("'", "")
-            else:  # check individual values
-                # Check a list of attrs that can return displayText values.
-                for attr in ['name', '_name', '__name__']:
-                    str_val = getattr(value, attr, None)
-                    if str_val:
-                        break
-                # If none of the above worked
-                if not str_val:
-                    str_val = str(value)
-
+        try:
+            key = _display_key(value)
+            return self._display_cache[key]
+        except KeyError:
+            str_val = self._get_display_str(value)
+            if len(self._display_cache) >= self.display_cache_size:
+                self._display_cache.clear()
+            self._display_cache[key] = str_val
             return str_val
-
-        return _get_display_str(value)
+        except TypeError:  # unhashable values are not cached
+            return self._get_display_str(value)
+
+    def _get_display_str(self, value):
+        """Recursively find a list of attr names for a DisplayText.
+
+        This uses the function in ``self.formatters`` for the type of value if
+        there is one. Otherwise it checks a number of attr names to see if any
+        are present and can be used to give a displayText value, or returns
+        the str generated using ``str(value)``. It will recursively search
+        ``dict`` and ``list`` values and return str(dict) or str(list) after
+        setting displayText's for each key+value (for dicts) or item (for
+        lists).
+        """
+        formatter = self.formatters.get(type(value))
+        if formatter:
+            return formatter(value)
+        if isinstance(value, list):  # recursively treat lists
+            list_val = []
+            for item in value:
+                list_val.append(self._get_display_str(item))
+            str_val = str(list_val).replace('"', '').replace("'", "")
+        elif isinstance(value, dict):  # recursively treat dicts
+            dict_val = {}
+            for key, val in value.items():
+                dict_val[self._get_display_str(key)] = \
+                    self._get_display_str(val)
+            str_val = str(dict_val).replace('"', '').replace("'", "")
+        else:  # check individual values
+            # Check a list of attrs that can return displayText values.
+            for attr in ['name', '_name', '__name__']:
+                str_val = getattr(value, attr, None)
+                if str_val:
+                    break
+            # If none of the above worked
+            if not str_val:
+                str_val = str(value)
+
+        return str_val
 
     def setEditorData(self, editor, index):
         """Sets the model data to the editor.
@@ -80,12 +150,7 @@ class MTableItemDelegate(QStyledItemDelegate):
         is used, which leads to a consistent approach with the
         ``self.setModelData(...)`` method.
         """
-        row = index.row()
-        column = index.column()
-        try:
-            value = index.model().item(row, column).data(Qt.DisplayRole)
-        except AttributeError:
-            value = None
+        value = index.data(Qt.DisplayRole)
         editor.set_default(value)
 
     def setModelData(self, editor, model, index):
@@ -105,36 +170,38 @@ class MTableItemDelegate(QStyledItemDelegate):
         number as inputs and is expected to return a dict mapping column names
         to new values for any columns to update in the given row. If
         ``model.update_coupled_parameters`` is ``None`` it just updates the
-        value defined by index.
+        value defined by index. The values are written using the
+        ``set_cells`` method of the view, so that all of them are undone
+        together.
         """
+        view = self.parent()
+        with view.undo_stack.command('edit'):
+            self._setModelData(view, editor, model, index)
 
-        column_names = list(self.parent().editor_map.keys())
+    def _setModelData(self, view, editor, model, index):
+        schema = self.schema
 
         # create a dict mapping the column_name to the value to be updated
         new_value = editor.get_parameters()[editor._name]
-        requested_parameters = {column_names[index.column()]: new_value}
+        requested_parameters = {schema.names[index.column()]: new_value}
         row = index.row()
 
         if model.update_coupled_parameters:
             # step through each column adding the value to parameters
             current_parameters = {}
             for column in range(0, model.columnCount()):
-                item = model.item(row, column)
-                if item:
-                    value = item.data(Qt.DisplayRole)
-                else:
-                    value = None
-                current_parameters[column_names[column]] = value
+                value = model.index(row, column).data(Qt.DisplayRole)
+                current_parameters[schema.names[column]] = value
             # call the function to get a new list of coupled values to update.
             new_parameters = model.update_coupled_parameters(
                 requested_parameters, current_parameters, index.row())
 
             for column_name, value in new_parameters.items():
-                column = column_names.index(column_name)
-                model.item(row, column).setData(value, Qt.DisplayRole)
+                column = schema.index[column_name]
+                view.set_cells(column, [row], [value])
 
         else:
-            model.setData(index, new_value, Qt.DisplayRole)
+            view.set_cells(index.column(), [row], [new_value])
 
     def createEditor(self, parent, option, index):
         """Creates the editor based on ``self.editor_map``.
@@ -144,10 +211,9 @@ class MTableItemDelegate(QStyledItemDelegate):
         ``self.editor_map`` dictionary relates to the cell to be edited, and
         creates the editor based on the type defined by the value for that key.
         """
-        column_name = list(self.editor_map.keys())[index.column()]
+        column = self.schema[index.column()]
 
-        editor = self.editor_map.get(column_name, MText)(column_name,
-                                                         parent=parent)
+        editor = column.editor(column.name, parent=parent)
 
         if editor:
             # ensure the editors background is opaque
@@ -174,10 +240,17 @@ class MTableInterfaceView(QTableView):
         args and kwargs to be passed to ``qtpy.QtWidgets.QTableView``.
     delegate : QitemDelegate, optional
         The ``qtpy.QItemDelegate`` to be associated with the class, default is
-        the ``MTableItemDelegate``.
+        the ``MTableItemDelegate``. It is created with the view, a name and
+        the ``editor_map`` kwarg, and also the ``schema`` kwarg if it is an
+        ``MTableItemDelegate``.
     model : QStandardItemModel, optional
         The ``qtpy.QtGui.QStandardItemModel`` to be associated with the
-        class, the default is ``qtpy.QtGui.QStandardItemModel.
+        class, the default is ``mily.widgets.MStandardItemModel``. For large
+        tables ``mily.widgets.MColumnarTableModel`` can be used instead.
+    schema : MTableSchema, optional
+        The ``mily.widgets.MTableSchema`` describing the columns, shared with
+        the delegate and the model. If ``None`` (the default) it is built from
+        editor_map.
     update_coupled_parameters : func, optional
         An optional function that is called every time the data in the model is
         updated. It must have the structure:
@@ -196,39 +269,371 @@ class MTableInterfaceView(QTableView):
         the current values and row is the model row index (as an int) that is
         to be updated. This function should return a dict mapping column names
         to values that should be updated.
+    update_coupled_columns : func, optional
+        An optional batch form of ``update_coupled_parameters`` that checks
+        the whole table at once after rows are added, deleted, moved or
+        duplicated. It must have the structure:
+
+        ..code-block:: python
+
+            def update_coupled_columns(columns)
+            ...
+
+            return new_columns
+
+        where ``columns`` is a dict mapping each column name to a NumPy array
+        of its values (``pandas.DataFrame(columns)`` gives a DataFrame), and
+        ``new_columns`` is a dict mapping the names of the columns to update
+        to arrays (or sequences) of new values for every row, or a single
+        value for all rows. Only the rows whose values change are written.
+    auto_size : bool, optional
+        If ``True`` (the default) the rows and columns are resized to fit
+        their contents whenever the data changes. Only the rows and columns
+        touched by a change are resized, and all of the changes made in one
+        pass of the event loop are resized together.
+    auto_size_sample : int, optional
+        The maximum number of rows measured when sizing a column, or when
+        sizing a large number of rows at once, in which case a sample of them
+        is used to set the default row height.
+    drag_rows : bool, optional
+        If ``True`` the selected rows can be reordered by dragging them to a
+        new position, the default is ``False``. The ``rowsDropped`` signal is
+        emitted with the rows that changed position after each drop.
+    undo_limit : int, optional
+        The memory cap in bytes of ``self.undo_stack``, the
+        ``mily.widgets.MTableUndoStack`` recording the changes made through
+        the view, 0 disables undo. The default is 64 MiB.
     """
 
+    rowsDropped = Signal(list)
+
     def __init__(self, parent, name, *args, editor_map={},
-                 delegate=MTableItemDelegate, model=QStandardItemModel,
-                 update_coupled_parameters=None, **kwargs):
+                 delegate=MTableItemDelegate, model=MStandardItemModel,
+                 schema=None, update_coupled_parameters=None,
+                 update_coupled_columns=None, auto_size=True,
+                 auto_size_sample=1000, drag_rows=False, undo_limit=2 ** 26,
+                 **kwargs):
         self._name = name
         self.editor_map = editor_map
+        self.schema = schema if schema is not None else MTableSchema(
+            editor_map)
+        self.auto_size_sample = auto_size_sample
+        self._pending_columns = set()
+        self._pending_rows = []
         super().__init__(*args, parent=parent, **kwargs)
         # Apply some style options
         self.horizontalHeader().setDefaultAlignment(Qt.AlignHCenter)
         self.setAlternatingRowColors(True)
-        # set the table delegate
+        if drag_rows:
+            self.setDragEnabled(True)
+            self.setAcceptDrops(True)
+            self.setDragDropMode(QAbstractItemView.InternalMove)
+        # set the table delegate, sharing the schema with
+        # ``MTableItemDelegate``s, as other delegates may not take it
+        delegate_kwargs = {'editor_map': self.editor_map}
+        if (isinstance(delegate, type)
+                and issubclass(delegate, MTableItemDelegate)):
+            delegate_kwargs['schema'] = self.schema
         self.setItemDelegate(delegate(self, self.parent()._name+'_model',
-                                      editor_map=self.editor_map))
-        # set the model and set column headers from editor_map if possible
+                                      **delegate_kwargs))
+        # set the model and set column headers from the schema if possible
         self.setModel(model(self))
         # add the function for dealing with coupled parameters.
         setattr(self.model(),
                 'update_coupled_parameters',
                 update_coupled_parameters)
+        setattr(self.model(),
+                'update_coupled_columns',
+                update_coupled_columns)
         if self.editor_map:
-            column_names = list(self.editor_map.keys())
-            self.model().setHorizontalHeaderLabels(column_names)
+            if hasattr(self.model(), 'set_schema'):
+                self.model().set_schema(self.schema)
+            else:
+                self.model().setHorizontalHeaderLabels(
+                    list(self.schema.names))
         # resize the table rows/columns to fit the displayText sizes
+        self.horizontalHeader().setResizeContentsPrecision(auto_size_sample)
         self.resizeColumnsToContents()
         self.resizeRowsToContents()
 
-        # resize the table to fit the contents on changes
-        signals = [self.itemDelegate().closeEditor, self.model().rowsInserted,
-                   self.model().dataChanged]
-        for signal in signals:
-            signal.connect(self.resizeColumnsToContents)
-            signal.connect(self.resizeRowsToContents)
+        # resize the table to fit the contents on changes, once per pass of
+        # the event loop
+        self._resizeTimer = QTimer(self)
+        self._resizeTimer.setSingleShot(True)
+        self._resizeTimer.setInterval(0)
+        self._resizeTimer.timeout.connect(self._autoSize)
+        model = self.model()
+        # the recorded row numbers are stale after a sort or a reset
+        self.undo_stack = MTableUndoStack(self, undo_limit)
+        model.modelReset.connect(self.undo_stack.clear)
+        model.layoutChanged.connect(self.undo_stack.clear)
+        # display strings cached by the delegate are stale after a change
+        if hasattr(self.itemDelegate(), 'clear_display_cache'):
+            model.dataChanged.connect(self.itemDelegate().clear_display_cache)
+            model.modelReset.connect(self.itemDelegate().clear_display_cache)
+        if auto_size:
+            model.dataChanged.connect(self._dataChanged)
+            model.rowsInserted.connect(self._rowsInserted)
+            model.modelReset.connect(self._contentsReset)
+            model.layoutChanged.connect(self._contentsReset)
+            self.itemDelegate().closeEditor.connect(self._editorClosed)
+
+    def _scheduleAutoSize(self, columns, first_row, last_row):
+        """Marks ``columns`` and rows ``first_row`` to ``last_row`` to be
+        resized on the next pass of the event loop."""
+        self._pending_columns.update(columns)
+        if last_row >= first_row:
+            self._pending_rows.append((first_row, last_row))
+        self._resizeTimer.start()
+
+    def _dataChanged(self, top_left, bottom_right, *args):
+        self._scheduleAutoSize(
+            range(top_left.column(), bottom_right.column() + 1),
+            top_left.row(), bottom_right.row())
+
+    def _rowsInserted(self, parent, first, last):
+        self._scheduleAutoSize(range(self.model().columnCount()), first, last)
+
+    def _contentsReset(self, *args):
+        model = self.model()
+        self._scheduleAutoSize(range(model.columnCount()), 0,
+                               model.rowCount() - 1)
+
+    def _editorClosed(self, *args):
+        # the editor may have changed the cell size, so restore it
+        index = self.currentIndex()
+        if index.isValid():
+            self._scheduleAutoSize([index.column()], index.row(), index.row())
+
+    def _autoSize(self):
+        """Resizes the rows and columns marked by ``_scheduleAutoSize``."""
+        columns, self._pending_columns = self._pending_columns, set()
+        ranges, self._pending_rows = self._pending_rows, []
+        column_count = self.model().columnCount()
+        row_count = self.model().rowCount()
+
+        for column in sorted(columns):
+            if column < column_count:
+                self.resizeColumnToContents(column)
+
+        rows = set()
+        for first, last in ranges:
+            rows.update(range(first, min(last, row_count - 1) + 1))
+        if len(rows) > self.auto_size_sample:
+            # too many to measure, so estimate the row height from a sample
+            # and apply it as the default
+            rows = sorted(rows)
+            step = len(rows) // self.auto_size_sample + 1
+            height = max(self.sizeHintForRow(row) for row in rows[::step])
+            if height > 0:
+                self.verticalHeader().setDefaultSectionSize(height)
+        else:
+            for row in sorted(rows):
+                self.resizeRowToContents(row)
+
+    def selected_blocks(self):
+        """Returns the selected rows as contiguous blocks.
+
+        The blocks are built from the ranges of the selection, rather than
+        from the selected cells, and are returned as a sorted list of
+        non-overlapping ``(first, last)`` row tuples.
+        """
+        ranges = sorted((selection_range.top(), selection_range.bottom())
+                        for selection_range in self.selectionModel().selection())
+        blocks = []
+        for first, last in ranges:
+            if blocks and first <= blocks[-1][1] + 1:
+                blocks[-1] = (blocks[-1][0], max(blocks[-1][1], last))
+            else:
+                blocks.append((first, last))
+        return blocks
+
+    def row_values(self, row):
+        """Returns the values in ``row`` as a list, in column order."""
+        model = self.model()
+        if hasattr(model, 'row_values'):
+            return model.row_values(row)
+        return [model.index(row, column).data(Qt.DisplayRole)
+                for column in range(model.columnCount())]
+
+    def insert_rows(self, row, rows):
+        """Inserts ``rows``, a list of lists of values in column order, at
+        ``row`` in one model operation."""
+        model = self.model()
+        self.undo_stack.record(('remove', row, len(rows)))
+        model.insertRows(row, len(rows))
+        if hasattr(model, 'set_column_values'):
+            new_rows = np.arange(row, row + len(rows))
+            for column, values in enumerate(zip(*rows)):
+                model.set_column_values(column, new_rows, list(values))
+            return
+        for offset, values in enumerate(rows):
+            for column, value in enumerate(values):
+                model.setData(model.index(row + offset, column), value,
+                              Qt.DisplayRole)
+
+    def remove_rows(self, first, count):
+        """Removes ``count`` rows from ``first`` in one model operation."""
+        if self.undo_stack.recording:
+            self.undo_stack.record(
+                ('insert', first, [self.row_values(row)
+                                   for row in range(first, first + count)]))
+        self.model().removeRows(first, count)
+
+    def set_cells(self, column, rows, values):
+        """Sets ``values`` to ``rows`` of ``column``.
+
+        Models that support ``set_column_values`` are updated with a single
+        ``dataChanged`` signal, others one cell at a time.
+        """
+        if not len(rows):
+            return
+        model = self.model()
+        if self.undo_stack.recording:
+            self.undo_stack.record(
+                ('cells', column, np.asarray(rows, dtype=int),
+                 [model.index(int(row), column).data(Qt.DisplayRole)
+                  for row in rows]))
+        if hasattr(model, 'set_column_values'):
+            model.set_column_values(column, rows, values)
+        else:
+            for row, value in zip(rows, values):
+                model.setData(model.index(int(row), column),
+                              _python_value(value), Qt.DisplayRole)
+
+    def move_rows(self, first, count, destination):
+        """Moves ``count`` rows from ``first`` to before ``destination``.
+
+        The rows are moved with a single ``model.moveRows`` call, which keeps
+        them selected if they were. Models that do not implement
+        ``moveRows``, such as ``QStandardItemModel``, have the rows removed
+        and re-inserted instead, after which the rows are selected again.
+        Returns the new position of the first row.
+        """
+        if first <= destination <= first + count:
+            return first
+        new_first = destination if destination < first else destination - count
+        model = self.model()
+        back = first if first < new_first else first + count
+        self.undo_stack.record(('move', new_first, count, back))
+        if model.moveRows(QModelIndex(), first, count, QModelIndex(),
+                          destination):
+            return new_first
+        selected = self.selectionModel().isRowSelected(first, QModelIndex())
+        values = [self.row_values(row) for row in range(first, first + count)]
+        with self.undo_stack.paused():
+            model.removeRows(first, count)
+            self.insert_rows(new_first, values)
+        if selected:
+            self.selectionModel().select(
+                QItemSelection(model.index(new_first, 0),
+                               model.index(new_first + count - 1, 0)),
+                QItemSelectionModel.Select | QItemSelectionModel.Rows)
+        return new_first
+
+    def move_blocks(self, blocks, destination):
+        """Moves the ``(first, last)`` row ``blocks`` to be contiguous and
+        before ``destination``, keeping their order.
+
+        Returns the rows that changed position.
+        """
+        if not blocks:
+            return []
+        changed = range(min(blocks[0][0], destination),
+                        max(blocks[-1][1] + 1, destination))
+        target = destination
+        # blocks above the destination are moved nearest first, so that the
+        # rows of those still to be moved do not shift
+        for first, last in reversed(blocks):
+            if first < target:
+                last = min(last, target - 1)
+                count = last - first + 1
+                self.move_rows(first, count, target)
+                target -= count
+        target = destination
+        for first, last in blocks:
+            first = max(first, target)
+            if first <= last:
+                count = last - first + 1
+                self.move_rows(first, count, target)
+                target += count
+        return list(changed)
+
+    def startDrag(self, supported_actions):
+        # the rows are moved by dropEvent, so the drag carries no data
+        drag = QDrag(self)
+        drag.setMimeData(QMimeData())
+        drag.exec_(Qt.MoveAction)
+
+    def dragEnterEvent(self, event):
+        if event.source() is self:
+            event.accept()
+        else:
+            super().dragEnterEvent(event)
+
+    def dragMoveEvent(self, event):
+        if event.source() is self:
+            event.setDropAction(Qt.MoveAction)
+            event.accept()
+        else:
+            super().dragMoveEvent(event)
+
+    def dropEvent(self, event):
+        """Moves the selected rows to the drop position."""
+        if event.source() is not self:
+            return super().dropEvent(event)
+        index = self.indexAt(event.pos())
+        if not index.isValid():
+            row = self.model().rowCount()
+        else:
+            row = index.row()
+            if event.pos().y() > self.visualRect(index).center().y():
+                row += 1
+        with self.undo_stack.command('move rows'):
+            changed = self.move_blocks(self.selected_blocks(), row)
+            self.rowsDropped.emit(changed)
+        # the rows have already been moved, so nothing is left for the drag
+        # source to remove
+        event.setDropAction(Qt.CopyAction)
+        event.accept()
+
+    def column_values(self, column, rows=slice(None)):
+        """Returns the values of ``column`` as a NumPy array, optionally only
+        those in the ``rows`` slice."""
+        model = self.model()
+        if hasattr(model, 'column_values'):
+            return model.column_values(column, rows)
+        return _as_array([model.index(row, column).data(Qt.DisplayRole)
+                          for row in range(model.rowCount())[rows]])
+
+    def check_coupled_columns(self):
+        """Runs the table through ``model.update_coupled_columns``.
+
+        The columns are passed to ``model.update_coupled_columns`` as arrays,
+        and the returned values are compared with the current ones so that
+        only the rows that changed are written, with one ``dataChanged``
+        signal per column on models that support ``set_column_values``, see
+        ``self.set_cells``.
+        """
+        model = self.model()
+        row_count = model.rowCount()
+        if not model.update_coupled_columns or not row_count:
+            return
+        columns = {name: self.column_values(column)
+                   for column, name in enumerate(self.schema.names)}
+        new_columns = model.update_coupled_columns(columns)
+
+        for column_name, values in new_columns.items():
+            column = self.schema.index[column_name]
+            if np.ndim(values) == 0 and not isinstance(values, (list, dict)):
+                values = [values] * row_count
+            values = _as_array(values)
+            if len(values) != row_count:
+                raise ValueError(
+                    f'update_coupled_columns returned {len(values)} values '
+                    f'for column {column_name!r}, expected {row_count}')
+            rows = _changed_rows(columns[column_name], values)
+            self.set_cells(column, rows, values[rows])
 
     def set_default(self, parameters):
         """Sets the default values from 'parameters' to the model
@@ -243,6 +648,11 @@ class MTableInterfaceView(QTableView):
             header to its value.
         """
         model = self.model()
+        self.undo_stack.clear()
+        # Models that can load all of the rows at once do so.
+        if hasattr(model, 'set_rows'):
+            model.set_rows(parameters)
+            return
         # Empty the model.
         model.removeRows(0, model.rowCount())
         # Add the new data to the model.
@@ -258,17 +668,126 @@ class MTableInterfaceView(QTableView):
                 row_data.append(item)
             model.appendRow(row_data)
 
+    def set_columns(self, columns):
+        """Sets the data of the model from 'columns', a column at a time.
+
+        This is the columnar equivalent of ``self.set_default``, which
+        overwrites any existing data in the model without building a dict per
+        row on models with a ``set_columns`` method.
+
+        Parameters
+        ----------
+        columns : dict or pandas.DataFrame
+            Maps the column headers to arrays (or other sequences) of values
+            of equal length, as returned by ``self.get_columns``. Columns
+            that are not included are filled with their default value.
+        """
+        model = self.model()
+        self.undo_stack.clear()
+        if hasattr(model, 'set_columns'):
+            model.set_columns(columns)
+            return
+        given = {name: columns[name] for name in self.schema.names
+                 if name in columns}
+        length = _column_length(given)
+        values = [_column_list(given[column.name]) if column.name in given
+                  else [column.default] * length for column in self.schema]
+        self.set_default([self.schema.row_dict(row) for row in zip(*values)])
+
+    def get_columns(self, as_frame=False):
+        """Returns the entire data from the table a column at a time.
+
+        This is the columnar equivalent of ``self.get_parameters``, which
+        reads each column in one pass rather than building a dict per row.
+        Rows of a source set by ``self.set_source`` that have not been loaded
+        yet are loaded first.
+
+        Parameters
+        ----------
+        as_frame : bool, optional
+            If ``True`` a ``pandas.DataFrame`` is returned, which requires
+            ``pandas``.
+
+        Returns
+        -------
+        columns : dict or pandas.DataFrame
+            Maps the column headers to NumPy arrays of their values, see
+            ``self.column_values``. Columns with missing values are object
+            arrays with ``None`` for them.
+        """
+        model = self.model()
+        if hasattr(model, 'fetch_all'):
+            model.fetch_all()
+        columns = {name: self.column_values(column)
+                   for column, name in enumerate(self.schema.names)}
+        if not as_frame:
+            return columns
+        try:
+            import pandas
+        except ImportError as ex:
+            raise ImportError('pandas is required to return the table as a '
+                              'DataFrame') from ex
+        return pandas.DataFrame(columns, columns=list(self.schema.names))
+
     def get_parameters(self):
         """Return the entire data from the table.
 
         Returns the entire table data as a list of dicts, with each dict being
         a row that maps the column header to it's value. This follows the
-        ``mily.widget`` API.
+        ``mily.widget`` API, see ``self.get_columns`` for the columnar
+        equivalent. Rows of a source set by ``self.set_source`` that
+        have not been loaded yet are included, see ``self.iter_rows``.
         """
-        parameters = []
-        for row in range(0, self.model().rowCount()):
-            parameters.append(self.get_row_parameters(row)[self._name])
-        return {self._name: parameters}
+        return {self._name: list(self.iter_rows())}
+
+    def iter_rows(self):
+        """Yields the data from the table one row at a time.
+
+        Each row is yielded as a dict mapping the column header to it's
+        value. If the model is loading rows lazily from a source, the rows
+        that have not been loaded are read from the source without loading
+        them into the model, see ``MStandardItemModel.iter_unloaded``. For
+        other models that can fetch more rows, the rest is loaded one page at
+        a time as the rows are consumed.
+        """
+        model = self.model()
+        row = 0
+        while True:
+            row_count = model.rowCount()
+            if hasattr(model, 'column_array'):
+                # array-backed models hold typed columns already, so read the
+                # loaded rows a column at a time. Other models are read row
+                # by row, so that no dtype has to be inferred.
+                rows = slice(row, row_count)
+                columns = [model.column_values(column, rows).tolist()
+                           for column in range(model.columnCount())]
+                for values in zip(*columns):
+                    yield self.schema.row_dict(values)
+                row = row_count
+            while row < row_count:
+                yield self.get_row_parameters(row)[self._name]
+                row += 1
+            if hasattr(model, 'iter_unloaded'):
+                for parameters in model.iter_unloaded():
+                    yield self.schema.row_dict(
+                        self.schema.row_values(parameters))
+                return
+            if not model.canFetchMore(QModelIndex()):
+                return
+            model.fetchMore(QModelIndex())
+
+    def set_source(self, rows, page_size=1000):
+        """Sets the rows of the table from ``rows`` lazily.
+
+        ``rows`` is any iterable of dicts mapping the column header to its
+        value, such as a generator or a reader of a file. Only the first
+        ``page_size`` rows are loaded, with the next page loaded whenever the
+        view is scrolled to the end of the table. This requires a model with
+        a ``set_source`` method, such as ``mily.widgets.MStandardItemModel``
+        or ``mily.widgets.MColumnarTableModel``.
+        """
+        self.undo_stack.clear()
+        self.model().set_source(rows, page_size=page_size)
 
     def get_row_parameters(self, row):
         """Returns the data associated with the row defined by 'row'.
@@ -286,17 +805,15 @@ class MTableInterfaceView(QTableView):
         parameters  : dict
             A dictionary mapping kwargs to values.
         """
-        column_names = list(self.editor_map.keys())
         model = self.model()
+        # Models that can return a whole row at once do so.
+        if hasattr(model, 'row_values'):
+            return {self._name: self.schema.row_dict(model.row_values(row))}
         # step through each column adding the value to parameters
         parameters = {}
         for column in range(0, model.columnCount()):
-            item = model.item(row, column)
-            if item:
-                value = item.data(Qt.DisplayRole)
-            else:
-                value = None
-            parameters[column_names[column]] = value
+            value = model.index(row, column).data(Qt.DisplayRole)
+            parameters[self.schema.names[column]] = value
 
         return {self._name: parameters}
 
@@ -323,6 +840,10 @@ class MTableInterfaceWidget(QWidget):
         up: moves the selected row(s) up
         down: moves the selected row(s) down
         duplicate: duplicates the selected row(s)
+        undo: undoes the last change to the table
+        redo: redoes the last undone change to the table
+    Moved rows stay selected, and with ``drag_rows=True`` the selected rows
+    can also be reordered by dragging them.
 
     Finally a list of 'default values' to be loaded into the table on
     initialization is defined using ``self.default_rows``. This is passed to
@@ -354,6 +875,39 @@ class MTableInterfaceWidget(QWidget):
     suffix_editor_map : OrderedDict, optional
         An OrderedDict that maps parameter names to editor widgets, for
         parameters that are to be displayed below the table.
+    model : QAbstractItemModel, optional
+        The model class to be used by ``self.tableView``, the default is
+        ``mily.widgets.MStandardItemModel``.
+    table_dtypes : dict, optional
+        An optional dict mapping column names to NumPy dtypes, used by models
+        with typed storage such as ``mily.widgets.MColumnarTableModel``.
+    table_defaults : dict, optional
+        An optional dict mapping column names to the values used for them in
+        new rows, and in rows loaded without them.
+    update_coupled_parameters : func, optional
+        An optional function to keep coupled parameters in a row consistent,
+        see ``MTableInterfaceView``.
+    update_coupled_columns : func, optional
+        An optional batch form of ``update_coupled_parameters`` that receives
+        whole columns as arrays, see ``MTableInterfaceView``.
+    row_dependence : str, optional
+        Declares which rows ``update_coupled_parameters`` has to revisit after
+        rows are added, deleted, moved or duplicated. The rows touched by the
+        operation (new rows, moved rows and the rows next to deleted ones) are
+        always revisited, and:
+            'row': (the default) no others, for coupled parameters that depend
+                only on the other values in the row.
+            'neighbours': also the rows either side of them, for coupled
+                parameters that depend on the adjacent rows.
+            'position': also every row whose position changed, for coupled
+                parameters that depend on the row number.
+            'table': every row in the table.
+    drag_rows : bool, optional
+        If ``True`` the selected rows can be reordered by dragging them, the
+        default is ``False``.
+    undo_limit : int, optional
+        The memory cap in bytes of the undo stack, 0 disables undo. The
+        default is 64 MiB.
     default_parameters : [dicts]
         A list of dicts following the structure defined above that contain
         default values to be loaded into the table.
@@ -368,26 +922,36 @@ class MTableInterfaceWidget(QWidget):
     """
 
     def __init__(self, name, *args, delegate=MTableItemDelegate,
+                 model=MStandardItemModel,
                  prefix_editor_map=OrderedDict({}),
                  table_editor_map=OrderedDict({}),
                  suffix_editor_map=OrderedDict({}),
+                 table_dtypes=None, table_defaults=None,
                  default_parameters=[],
-                 update_coupled_parameters=None, title='Default Title',
-                 geometry=(100, 100, 800, 300), mainLayoutString=None,
-                 **kwargs):
+                 update_coupled_parameters=None, update_coupled_columns=None,
+                 row_dependence='row', drag_rows=False, undo_limit=2 ** 26,
+                 title='Default Title', geometry=(100, 100, 800, 300),
+                 mainLayoutString=None, **kwargs):
         super().__init__(*args, **kwargs)
+        if row_dependence not in ('row', 'neighbours', 'position', 'table'):
+            raise ValueError(f'unknown row_dependence {row_dependence!r}')
         self._name = name
+        self.row_dependence = row_dependence
         self.prefix_editor_map = prefix_editor_map
         self.table_editor_map = table_editor_map
         self.suffix_editor_map = suffix_editor_map
+        self.table_schema = MTableSchema(table_editor_map, dtypes=table_dtypes,
+                                         defaults=table_defaults)
         self.default_parameters = default_parameters
         self.title = title
         self.geometry = geometry
         self.mainLayoutString = mainLayoutString
         self.setAutoFillBackground(True)
-        self._initUI(delegate, update_coupled_parameters)
+        self._initUI(delegate, model, update_coupled_parameters,
+                     update_coupled_columns, drag_rows, undo_limit)
 
-    def _initUI(self, delegate, update_coupled_parameters):
+    def _initUI(self, delegate, model, update_coupled_parameters,
+                update_coupled_columns, drag_rows, undo_limit):
 
         # set the title, location and size of the Widget
         self.setWindowTitle(self.title)
@@ -415,8 +979,12 @@ class MTableInterfaceWidget(QWidget):
             # create the table view
             self.tableView = MTableInterfaceView(
                 self, self._name + '_view', editor_map=self.table_editor_map,
-                delegate=delegate,
-                update_coupled_parameters=update_coupled_parameters)
+                delegate=delegate, model=model, schema=self.table_schema,
+                update_coupled_parameters=update_coupled_parameters,
+                update_coupled_columns=update_coupled_columns,
+                drag_rows=drag_rows, undo_limit=undo_limit)
+            self.tableView.rowsDropped.connect(
+                self._check_table_after_row_manipulation)
             self.mainLayout.addWidget(self.tableView)
 
             # enable sorting of the table
@@ -464,6 +1032,21 @@ class MTableInterfaceWidget(QWidget):
             self.duplicateRowBtn.clicked.connect(self._duplicateRow)
             self.btnLayout.addWidget(self.duplicateRowBtn)
 
+            self.undoBtn = QPushButton('undo', self)
+            self.undoBtn.clicked.connect(self.undo)
+            self.btnLayout.addWidget(self.undoBtn)
+
+            self.redoBtn = QPushButton('redo', self)
+            self.redoBtn.clicked.connect(self.redo)
+            self.btnLayout.addWidget(self.redoBtn)
+
+            QShortcut(QKeySequence.Undo, self.tableView, self.undo,
+                      context=Qt.WidgetShortcut)
+            QShortcut(QKeySequence.Redo, self.tableView, self.redo,
+                      context=Qt.WidgetShortcut)
+            self.tableView.undo_stack.sigChanged.connect(self._undoChanged)
+            self._undoChanged()
+
         # create the layout and add the widgets
         self.mainLayout.addLayout(self.btnLayout)
         self.setLayout(self.mainLayout)
@@ -501,6 +1084,88 @@ class MTableInterfaceWidget(QWidget):
         if self.table_editor_map:
             self.tableView.set_default(parameters)
 
+    def set_table_columns(self, columns):
+        """Sets the table from ``columns``, a dict of arrays or a
+        ``pandas.DataFrame``.
+
+        See ``MTableInterfaceView.set_columns``, the prefix and suffix
+        parameters are unchanged.
+        """
+        self.tableView.set_columns(columns)
+
+    def get_table_columns(self, as_frame=False):
+        """Returns the table as a dict of NumPy arrays, or a
+        ``pandas.DataFrame`` if ``as_frame`` is ``True``.
+
+        See ``MTableInterfaceView.get_columns``, the prefix and suffix
+        parameters are not included.
+        """
+        return self.tableView.get_columns(as_frame=as_frame)
+
+    def set_table_source(self, rows, page_size=1000):
+        """Sets the table rows lazily from ``rows``, an iterable of dicts.
+
+        See ``MTableInterfaceView.set_source``, the prefix and suffix
+        parameters are unchanged.
+        """
+        self.tableView.set_source(rows, page_size=page_size)
+
+    def import_table(self, path, format=None, page_size=1000):
+        """Loads the prefix, table and suffix parameters from a file.
+
+        The file can be a CSV, JSON Lines or Parquet (which requires
+        ``pyarrow``) file, as written by ``self.export_table``. The columns
+        are matched to ``self.table_editor_map`` by name, and columns or
+        parameters that are not in the editor maps are ignored. The rows are
+        streamed from the file into models with a ``set_source`` method, one
+        page at a time as in ``self.set_table_source``, and loaded in bulk
+        into other models, as with ``self.set_default``.
+
+        Parameters
+        ----------
+        path : str
+            The file to read.
+        format : str, optional
+            One of 'csv', 'jsonl' or 'parquet', found from the file
+            extension if ``None``.
+        page_size : int, optional
+            The number of rows loaded at a time into models with a
+            ``set_source`` method.
+        """
+        prefix, rows, suffix = read_table(path, self.table_schema.names,
+                                          dtypes=self.table_schema.dtypes,
+                                          format=format)
+        prefix = {parameter: value for parameter, value in prefix.items()
+                  if parameter in self.prefix_editor_map}
+        suffix = {parameter: value for parameter, value in suffix.items()
+                  if parameter in self.suffix_editor_map}
+        if (self.table_editor_map
+                and hasattr(self.tableView.model(), 'set_source')):
+            self.set_default([prefix, suffix])
+            self.set_table_source(rows, page_size=page_size)
+        else:
+            self.set_default([prefix, *rows, suffix])
+
+    def export_table(self, path, format=None):
+        """Writes the prefix, table and suffix parameters to a file.
+
+        The rows are streamed from the model to the file, see
+        ``mily.widgets.table_io.write_table`` for the file layouts.
+
+        Parameters
+        ----------
+        path : str
+            The file to write.
+        format : str, optional
+            One of 'csv', 'jsonl' or 'parquet', found from the file
+            extension if ``None``.
+        """
+        rows = self.tableView.iter_rows() if self.table_editor_map else []
+        write_table(path, self.table_schema.names, rows,
+                    prefix=self.get_prefix_parameters()[self._name],
+                    suffix=self.get_suffix_parameters()[self._name],
+                    format=format)
+
     def get_parameters(self):
         """Return the entire data from the table.
 
@@ -578,91 +1243,109 @@ class MTableInterfaceWidget(QWidget):
     def _addRow(self):
         """Inserts an empty row after the (last) currently selected row(s)."""
 
-        indices = self.tableView.selectionModel().selectedIndexes()
-        rows = [index.row() for index in indices]
-        rows.sort(reverse=True)
-        empty_row = []
-        for column in range(self.tableView.model().columnCount()):
-            item = QStandardItem()
-            item.setData(None, Qt.DisplayRole)
-            empty_row.append(item)
-        if rows:  # add an empty row after the last selected row
-            self.tableView.model().insertRow(rows[0] + 1, empty_row)
+        blocks = self.tableView.selected_blocks()
+        if blocks:  # add an empty row after the last selected row
+            row = blocks[-1][1] + 1
         else:  # If no rows selected add row at end of table
-            end_row = self.tableView.model().rowCount()
-            self.tableView.model().insertRow(end_row, empty_row)
-        self._check_table_after_row_manipulation()
+            row = self.tableView.model().rowCount()
+        with self.tableView.undo_stack.command('add row'):
+            self.tableView.insert_rows(row, [self.table_schema.default_row()])
+            self._check_table_after_row_manipulation([row], shifted=row + 1)
 
     def _delRow(self):
         """Deletes the selected row(s)."""
-        indices = self.tableView.selectionModel().selectedIndexes()
-        rows = [index.row() for index in indices]
-        rows.sort(reverse=True)
-        if self._check_rows(rows):
-            for row in rows:
-                self.tableView.model().takeRow(row)
-        self._check_table_after_row_manipulation()
+        blocks = self.tableView.selected_blocks()
+        dirty = []
+        if self._check_rows(blocks):
+            with self.tableView.undo_stack.command('delete rows'):
+                for first, last in reversed(blocks):
+                    count = last - first + 1
+                    self.tableView.remove_rows(first, count)
+                    # the rows either side of the deleted block are now
+                    # adjacent
+                    dirty = [row - count if row > last else row
+                             for row in dirty]
+                    dirty += [first - 1, first]
+                self._check_table_after_row_manipulation(
+                    dirty, shifted=blocks[0][0])
 
     def _upRow(self):
         """Moves the currently selected row(s) up one."""
-        indices = self.tableView.selectionModel().selectedIndexes()
-        rows = [index.row()
-                for index in indices
-                if index.row() != 0]
-        rows.sort()
-        if self._check_rows(rows):
-            for row in rows:
-                items = self.tableView.model().takeRow(row)
-                self.tableView.model().insertRow(row - 1, items)
-        self._check_table_after_row_manipulation()
+        blocks = [(first, last) for first, last in self.tableView.selected_blocks()
+                  if first != 0]
+        if self._check_rows(blocks):
+            dirty = []
+            with self.tableView.undo_stack.command('move rows up'):
+                for first, last in blocks:
+                    self.tableView.move_rows(first, last - first + 1,
+                                             first - 1)
+                    dirty.extend(range(first - 1, last + 1))
+                self._check_table_after_row_manipulation(dirty)
 
     def _downRow(self):
         """Moves the currently selected row(s) down one."""
         last_row = self.tableView.model().rowCount()-1
-        indices = self.tableView.selectionModel().selectedIndexes()
-        rows = [index.row()
-                for index in indices
-                if index.row() != last_row]
-        rows.sort(reverse=True)
-        if self._check_rows(rows):
-            for row in rows:
-                items = self.tableView.model().takeRow(row)
-                self.tableView.model().insertRow(row + 1, items)
-        self._check_table_after_row_manipulation()
+        blocks = [(first, last) for first, last in self.tableView.selected_blocks()
+                  if last != last_row]
+        if self._check_rows(blocks):
+            dirty = []
+            with self.tableView.undo_stack.command('move rows down'):
+                for first, last in reversed(blocks):
+                    self.tableView.move_rows(first, last - first + 1,
+                                             last + 2)
+                    dirty.extend(range(first, last + 2))
+                self._check_table_after_row_manipulation(dirty)
 
     def _duplicateRow(self):
         """Duplicates the selected row(s) into the table after the row(s)."""
 
         # find the selected row(s)
-        indices = self.tableView.selectionModel().selectedIndexes()
-        rows = [index.row() for index in indices]
-        rows.sort(reverse=True)
-
-        if self._check_rows(rows):
-            model = self.tableView.model()
-            for row in rows:
-                row_data = []
-                for column in range(model.columnCount()):
-                    value = model.item(row, column).data(Qt.DisplayRole)
-                    item = QStandardItem()
-                    item.setData(value, Qt.DisplayRole)
-                    row_data.append(item)
-                model.insertRow(row + 1, row_data)
-        self._check_table_after_row_manipulation()
+        blocks = self.tableView.selected_blocks()
+
+        dirty = []
+        if self._check_rows(blocks):
+            with self.tableView.undo_stack.command('duplicate rows'):
+                for first, last in reversed(blocks):
+                    count = last - first + 1
+                    self.tableView.insert_rows(
+                        last + 1, [self.tableView.row_values(row)
+                                   for row in range(first, last + 1)])
+                    dirty = [row + count if row > last else row
+                             for row in dirty]
+                    dirty.extend(range(last + 1, last + 1 + count))
+                self._check_table_after_row_manipulation(
+                    dirty, shifted=blocks[0][1] + 1)
+
+    def undo(self):
+        """Undoes the last change to the table."""
+        self.tableView.undo_stack.undo()
+
+    def redo(self):
+        """Redoes the last undone change to the table."""
+        self.tableView.undo_stack.redo()
+
+    def _undoChanged(self):
+        stack = self.tableView.undo_stack
+        self.undoBtn.setEnabled(stack.can_undo())
+        self.undoBtn.setToolTip(f'undo {stack.undo_text()}'.strip())
+        self.redoBtn.setEnabled(stack.can_redo())
+        self.redoBtn.setToolTip(f'redo {stack.redo_text()}'.strip())
 
     def _check_rows(self, rows, only_one=False):
         """Checks how many items are in ``rows`` and alerts user if not right.
 
-        Checks the number of indices in ``rows``, alerts the user with a
-        popup box if there are no items in ``rows``. Alternatively if the kwarg
+        Checks the number of rows in ``rows``, alerts the user with a
+        popup box if there are no rows in ``rows``. Alternatively if the kwarg
         ``only_one`` is ``True`` also alerts users that too many rows are
-        selected. Returns ``True`` if the right number(s) of items are in
+        selected. Returns ``True`` if the right number(s) of rows are in
         ``rows`` otherwise it returns ``False``.
 
         Parameters
         ----------
-        rows : [row indices]
-            A list of row indices to be checked.
+        rows : [row indices] or [(first, last)]
+            A list of row indices, or of blocks of rows as returned by
+            ``self.tableView.selected_blocks``, to be checked. ``only_one`` requires
+            row indices.
         only_one : Bool, optional
             A boolean that indicates if more than one row is allowed, default
             is ``False``.
@@ -702,26 +1385,55 @@ class MTableInterfaceWidget(QWidget):
 
         return Ok
 
-    def _check_table_after_row_manipulation(self):
+    def _dirty_rows(self, rows, shifted=None):
+        """Returns the sorted rows to revisit after a row manipulation.
+
+        Expands the rows touched by the manipulation, ``rows``, according to
+        ``self.row_dependence``. ``shifted`` is the first row whose position
+        was changed by the manipulation, along with every row after it.
+        """
+        row_count = self.tableView.model().rowCount()
+        if rows is None or self.row_dependence == 'table':
+            return list(range(row_count))
+        rows = set(rows)
+        if self.row_dependence == 'neighbours':
+            rows.update([row + offset for row in rows for offset in (-1, 1)])
+        elif self.row_dependence == 'position' and shifted is not None:
+            rows.update(range(shifted, row_count))
+        return sorted(row for row in rows if 0 <= row < row_count)
+
+    def _check_table_after_row_manipulation(self, rows=None, shifted=None):
         """Updates coupled arguments after row manipulation.
 
-        This method runs all of the rows in the table through the method
+        This method runs the table through
+        ``self.tableView.check_coupled_columns`` and the rows affected by the
+        manipulation through the method
         ``self.tableView.model().update_coupled_parameters`` to ensure that
         the new arrangment is ok, it will update any values that are not.
+
+        Parameters
+        ----------
+        rows : [row indices], optional
+            The rows touched by the manipulation, these are expanded using
+            ``self.row_dependence``. If ``None`` all rows are checked.
+        shifted : int, optional
+            The first row whose position was changed by the manipulation.
         """
+        if self.table_editor_map:
+            self.tableView.check_coupled_columns()
         if (self.table_editor_map and self.tableView.model().update_coupled_parameters):
-            # step through each row and check it
+            # step through each affected row and check it
             model = self.tableView.model()
-            column_names = list(self.table_editor_map.keys())
-            for row in range(model.rowCount()):
+            column_index = self.table_schema.index
+            for row in self._dirty_rows(rows, shifted):
                 current_parameters = self.get_row_parameters(row)[self._name]
                 requested_parameters = {}
                 new_parameters = model.update_coupled_parameters(
                     requested_parameters, current_parameters, row)
                 for column_name, value in new_parameters.items():
                     if value != current_parameters[column_name]:
-                        column = column_names.index(column_name)
-                        model.item(row, column).setData(value, Qt.DisplayRole)
+                        column = column_index[column_name]
+                        self.tableView.set_cells(column, [row], [value])
 
 
 class MFunctionTableInterfaceWidget(MTableInterfaceWidget):
@@ -729,10 +1441,18 @@ class MFunctionTableInterfaceWidget(MTableInterfaceWidget):
 
     Extends the MTableInterfaceWidget by associating the table with a kwarg
     only function, where each kwarg for the function maps to a table column, a
-    prefix parameter or a suffix parameter. It also adds the extra buttons:
-        export: exports the selected row by calling ``self.function(...)`` with
-            the kwargs from the selected row and any prefix or suffix values.
-            Does not work with multiple rows selected.
+    prefix parameter or a suffix parameter. The function is called for each
+    row with the kwargs from the row and any prefix or suffix values, one row
+    at a time on a background thread, so the GUI stays responsive. The calls
+    are queued in ``self.queue``, a ``mily.widgets.MExecutionQueue`` which is
+    shown below the buttons with the status and elapsed time of each call. It
+    also adds the extra buttons:
+        execute: queues the selected rows.
+        execute all: queues every row of the table.
+        pause: holds the queued rows, the running one is not interrupted.
+        abort: asks the running row to stop (see
+            ``mily.utils.threads.cancellation_requested``) and drops the
+            queued ones.
 
     Parameters
     ----------
@@ -746,27 +1466,91 @@ class MFunctionTableInterfaceWidget(MTableInterfaceWidget):
     def __init__(self, function, *args, **kwargs):
         self.function = function
         super().__init__(*args, **kwargs)
+        self.queue = MExecutionQueue(self._call_function, self)
 
         self.executeBtn = QPushButton('execute', self)
         self.executeBtn.setToolTip('executes the "function" with "kwargs" '
-                                   'from the selected row')
+                                   'from the selected row(s)')
         self.executeBtn.clicked.connect(self.execute)
         self.btnLayout.addWidget(self.executeBtn)
 
+        self.executeAllBtn = QPushButton('execute all', self)
+        self.executeAllBtn.setToolTip('executes the "function" with "kwargs" '
+                                      'from every row')
+        self.executeAllBtn.clicked.connect(self.execute_all)
+        self.btnLayout.addWidget(self.executeAllBtn)
+
+        self.pauseBtn = QPushButton('pause', self)
+        self.pauseBtn.setCheckable(True)
+        self.pauseBtn.setToolTip('holds the queued rows')
+        self.pauseBtn.toggled.connect(self.queue.pause)
+        self.btnLayout.addWidget(self.pauseBtn)
+
+        self.abortBtn = QPushButton('abort', self)
+        self.abortBtn.setToolTip('stops the running row and drops the queued '
+                                 'rows')
+        self.abortBtn.clicked.connect(self.abort)
+        self.btnLayout.addWidget(self.abortBtn)
+
+        self.queueView = QTableView(self)
+        self.queueView.setModel(self.queue)
+        self.queueView.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.queueView.setSelectionMode(QAbstractItemView.NoSelection)
+        self.mainLayout.addWidget(self.queueView)
+
+        self.queue.sigStarted.connect(self._queueChanged)
+        self.queue.sigIdle.connect(self._queueChanged)
+        self.queue.rowsInserted.connect(self._queueChanged)
+        self._queueChanged()
+
+    def _call_function(self, **parameters):
+        return self.function(**parameters)
+
+    def _call_parameters(self):
+        """Returns a function merging the prefix and suffix parameters, which
+        are read once, into the kwargs of a row."""
+        # add the prefix parameter data (if any)
+        prefix = self.get_prefix_parameters()[self._name]
+        # add the suffix parameter data (if any)
+        suffix = self.get_suffix_parameters()[self._name]
+
+        def call_parameters(row_parameters):
+            return {**prefix, **row_parameters, **suffix}
+        return call_parameters
+
     def execute(self):
-        """Executes the function for the selected row"""
-
-        indices = self.tableView.selectionModel().selectedIndexes()
-        rows = [index.row() for index in indices]
-
-        if self._check_rows(rows, only_one=True):
-            row = rows[0]
-            parameters = {}
-            # add the prefix parameter data (if any)
-            parameters.update(self.get_prefix_parameters()[self._name])
-            # add tableView parameters
-            parameters.update(self.get_row_parameters(row)[self._name])
-            # add the suffix parameter data (if any)
-            parameters.update(self.get_suffix_parameters()[self._name])
-
-            self.function(**parameters)
+        """Queues the function for the selected row(s), in table order.
+
+        The kwargs of each row are read when it is queued, so later edits to
+        the table do not change the queued calls.
+        """
+        rows = [row for first, last in self.tableView.selected_blocks()
+                for row in range(first, last + 1)]
+
+        if self._check_rows(rows):
+            call_parameters = self._call_parameters()
+            for row in rows:
+                row_parameters = self.get_row_parameters(row)[self._name]
+                # rows are labelled as in the vertical header
+                self.queue.enqueue(row + 1, call_parameters(row_parameters))
+
+    def execute_all(self):
+        """Queues the function for every row of the table, in table order."""
+        call_parameters = self._call_parameters()
+        if not self.table_editor_map:
+            self.queue.enqueue(None, call_parameters({}))
+            return
+        for row, row_parameters in enumerate(self.tableView.iter_rows()):
+            self.queue.enqueue(row + 1, call_parameters(row_parameters))
+
+    def pause(self, paused=True):
+        """Holds the queued rows, or releases them if ``paused`` is
+        ``False``."""
+        self.pauseBtn.setChecked(paused)
+
+    def abort(self):
+        """Asks the running row to stop and drops the queued ones."""
+        self.queue.abort()
+
+    def _queueChanged(self, *args):
+        self.abortBtn.setEnabled(self.queue.running or self.queue.pending > 0)
@@ -0,0 +1,265 @@
+import csv
+import itertools
+import json
+import math
+import os
+
+import numpy as np
+
+
+# the first characters of the JSON values other than strings
+_JSON_START = frozenset('-0123456789[{"tfnNI \t')
+
+_EXTENSIONS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl',
+               '.parquet': 'parquet', '.pq': 'parquet'}
+
+
+def table_format(path, format=None):
+    """Returns the format of ``path``, 'csv', 'jsonl' or 'parquet'.
+
+    If ``format`` is ``None`` it is found from the file extension.
+    """
+    if format is None:
+        format = _EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if format not in ('csv', 'jsonl', 'parquet'):
+        raise ValueError(f'unknown table format for {path!r}, use one of '
+                         f'csv, jsonl or parquet')
+    return format
+
+
+def _json_default(value):
+    """Converts the NumPy values json does not know about."""
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    raise TypeError(f'{value!r} of type {type(value).__name__} can not be '
+                    f'written to a table file')
+
+
+_dumps = json.JSONEncoder(default=_json_default).encode
+
+
+def _to_cell(value):
+    """Converts ``value`` to a CSV cell, strings are written as they are and
+    other values, or strings that would be read back as another value, as
+    JSON."""
+    value_type = type(value)
+    if value_type is str:
+        if not value or value[0] in _JSON_START and _from_cell(value) != value:
+            return _dumps(value)
+        return value
+    if value is None:
+        return ''
+    if value_type is int or value_type is float and math.isfinite(value):
+        return repr(value)
+    return _dumps(value)
+
+
+def _from_cell(cell):
+    """Converts a CSV cell written by ``_to_cell`` back to a value."""
+    if cell == '':
+        return None
+    if cell[0] not in _JSON_START:
+        return cell
+    try:
+        return json.loads(cell)
+    except ValueError:
+        return cell
+
+
+def _cell_converter(dtype):
+    """Returns the function converting CSV cells of a column of ``dtype``."""
+    if dtype is None or dtype.kind not in 'biufc':
+        return _from_cell
+    if dtype.kind == 'b':
+        def convert(cell):
+            return cell.lower() in ('true', '1') if cell else None
+    else:
+        to_type = {'i': int, 'u': int, 'f': float, 'c': complex}[dtype.kind]
+
+        def convert(cell):
+            return to_type(cell) if cell else None
+    return convert
+
+
+def _read_csv(path, columns, dtypes):
+    metadata = {}
+    with open(path, newline='') as handle:
+        # the prefix and suffix parameters are on comment lines before the
+        # header row, other comments are ignored
+        while True:
+            start = handle.tell()
+            line = handle.readline()
+            if not line.startswith('#'):
+                break
+            key, _, value = line[1:].strip().partition(' ')
+            if key in ('prefix', 'suffix'):
+                metadata[key] = json.loads(value)
+    return (metadata.get('prefix', {}), _csv_rows(path, start, columns, dtypes),
+            metadata.get('suffix', {}))
+
+
+def _csv_rows(path, start, columns, dtypes):
+    """Yields the rows of the CSV file ``path`` from its header row, at
+    ``start``."""
+    with open(path, newline='') as handle:
+        handle.seek(start)
+        reader = csv.reader(handle)
+        header = next(reader, [])
+        converters = [(position, name, _cell_converter(dtypes.get(name)))
+                      for position, name in enumerate(header)
+                      if name in columns]
+        for cells in reader:
+            if cells:
+                yield {name: convert(cells[position])
+                       for position, name, convert in converters}
+
+
+def _write_csv(path, columns, rows, prefix, suffix):
+    with open(path, 'w', newline='') as handle:
+        handle.write(f'# prefix {_dumps(prefix)}\n')
+        handle.write(f'# suffix {_dumps(suffix)}\n')
+        writer = csv.writer(handle)
+        writer.writerow(columns)
+        writer.writerows([_to_cell(row.get(name)) for name in columns]
+                         for row in rows)
+
+
+def _read_jsonl(path, columns):
+    # the lines follow the structure of ``get_parameters``: the prefix
+    # parameters, one line per row and the suffix parameters, so the lines
+    # are counted first to know which is the last
+    count, first, last = 0, None, None
+    with open(path) as handle:
+        for line in handle:
+            if line.strip():
+                count += 1
+                first = first or line
+                last = line
+    if not count:
+        return {}, iter(()), {}
+    return (json.loads(first), _jsonl_rows(path, set(columns), count - 2),
+            json.loads(last) if count > 1 else {})
+
+
+def _jsonl_rows(path, columns, count):
+    """Yields the ``count`` rows of the JSON Lines file ``path``, after its
+    prefix line."""
+    with open(path) as handle:
+        lines = (line for line in handle if line.strip())
+        next(lines)
+        for line in itertools.islice(lines, max(count, 0)):
+            yield {name: value for name, value in json.loads(line).items()
+                   if name in columns}
+
+
+def _write_jsonl(path, columns, rows, prefix, suffix):
+    with open(path, 'w') as handle:
+        handle.write(_dumps(prefix) + '\n')
+        for row in rows:
+            handle.write(_dumps({name: row.get(name) for name in columns})
+                         + '\n')
+        handle.write(_dumps(suffix) + '\n')
+
+
+def _parquet():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as ex:
+        raise ImportError('pyarrow is required to read and write Parquet '
+                          'files') from ex
+    return pyarrow, pyarrow.parquet
+
+
+def _read_parquet(path, columns):
+    _, parquet = _parquet()
+    table_file = parquet.ParquetFile(path)
+    schema = table_file.schema_arrow
+    metadata = json.loads((schema.metadata or {}).get(b'mily', b'{}'))
+    return (metadata.get('prefix', {}),
+            _parquet_rows(table_file, [name for name in schema.names
+                                       if name in columns]),
+            metadata.get('suffix', {}))
+
+
+def _parquet_rows(table_file, columns):
+    """Yields the rows of ``table_file``, one record batch at a time."""
+    for batch in table_file.iter_batches(columns=columns):
+        yield from batch.to_pylist()
+
+
+def _write_parquet(path, columns, rows, prefix, suffix):
+    pyarrow, parquet = _parquet()
+    data = {name: [] for name in columns}
+    appends = [data[name].append for name in columns]
+    for row in rows:
+        for name, append in zip(columns, appends):
+            append(row.get(name))
+    table = pyarrow.table(data)
+    metadata = {b'mily': _dumps({'prefix': prefix, 'suffix': suffix})}
+    table = table.replace_schema_metadata(
+        {**(table.schema.metadata or {}), **metadata})
+    parquet.write_table(table, path)
+
+
+def read_table(path, columns, dtypes=None, format=None):
+    """Reads a table written by ``write_table``.
+
+    Parameters
+    ----------
+    path : str
+        The file to read.
+    columns : [str]
+        The names of the columns to read, any other columns are ignored.
+    dtypes : dict, optional
+        An optional dict mapping column names to NumPy dtypes, used to
+        convert the text of CSV files.
+    format : str, optional
+        One of 'csv', 'jsonl' or 'parquet', found from the file extension if
+        ``None``.
+
+    Returns
+    -------
+    prefix, rows, suffix : dict, iterator of dicts, dict
+        The prefix parameters, the rows as dicts mapping the column names to
+        values and the suffix parameters. The rows are read from the file as
+        they are consumed.
+    """
+    format = table_format(path, format)
+    if format == 'csv':
+        return _read_csv(path, columns, dtypes or {})
+    elif format == 'jsonl':
+        return _read_jsonl(path, columns)
+    return _read_parquet(path, columns)
+
+
+def write_table(path, columns, rows, prefix=None, suffix=None, format=None):
+    """Writes a table and its prefix and suffix parameters to a file.
+
+    CSV files have the prefix and suffix parameters as JSON on '#' comment
+    lines before the header row, and non-str values as JSON. JSON Lines
+    files have a line for the prefix parameters, one for each row and one
+    for the suffix parameters, following the structure of
+    ``MTableInterfaceWidget.get_parameters``. Parquet files, which require
+    ``pyarrow``, have the prefix and suffix parameters in the schema
+    metadata.
+
+    Parameters
+    ----------
+    path : str
+        The file to write.
+    columns : [str]
+        The names of the columns to write, in order.
+    rows : iterable of dicts
+        The rows, as dicts mapping the column names to values. These are
+        written as they are consumed.
+    prefix, suffix : dict, optional
+        The prefix and suffix parameters.
+    format : str, optional
+        One of 'csv', 'jsonl' or 'parquet', found from the file extension if
+        ``None``.
+    """
+    format = table_format(path, format)
+    writer = {'csv': _write_csv, 'jsonl': _write_jsonl,
+              'parquet': _write_parquet}[format]
+    writer(path, list(columns), rows, prefix or {}, suffix or {})
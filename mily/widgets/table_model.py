@@ -0,0 +1,801 @@
+from itertools import islice
+
+import numpy as np
+from qtpy.QtCore import Qt, QAbstractTableModel, QModelIndex
+from qtpy.QtGui import QStandardItemModel, QStandardItem
+
+
+# the python type each kind of NumPy value is read back as
+_KIND_TYPES = {'b': bool, 'i': int, 'u': int, 'f': float, 'c': complex}
+
+
+def _array_fits(values, dtype):
+    """Check if the array ``values`` can be stored in an array of ``dtype``
+    and read back as the same python objects.
+
+    The values have to be of a kind read back as the same python type, so
+    that ints stay ints and floats stay floats, and, unless ``dtype`` holds
+    every value of their dtype, within its range.
+    """
+    if dtype.hasobject:
+        return True
+    value_type = _KIND_TYPES.get(values.dtype.kind)
+    if value_type is None or value_type is not _KIND_TYPES.get(dtype.kind):
+        return False
+    if np.can_cast(values.dtype, dtype, casting='safe') or not len(values):
+        return True
+    if dtype.kind in 'iu':
+        info = np.iinfo(dtype)
+        return bool(info.min <= values.min() and values.max() <= info.max)
+    if dtype.kind == 'b':
+        return True
+    # floats lose precision in a smaller dtype, but only change type when
+    # they are out of its range
+    finite = values[np.isfinite(values)]
+    limit = np.finfo(dtype).max
+    return bool((np.abs(finite.real) <= limit).all()
+                and (np.abs(finite.imag) <= limit).all())
+
+
+def _fits(value, dtype):
+    """Check if ``value`` can be stored in an array of ``dtype`` unchanged."""
+    if dtype.hasobject:
+        return True
+    if not isinstance(value, (bool, int, float, complex, np.generic)):
+        return False
+    # python ints too large for any integer dtype give an object array
+    return _array_fits(np.asarray(value).reshape(1), dtype)
+
+
+def _infer_dtype(values):
+    """Returns the dtype to store ``values`` in, ``object`` unless they
+    are all numbers or booleans of the same type that fit one NumPy dtype.
+
+    The dtype is found from all of the values, as python ints can be too
+    large for the dtype of the first one, and any that do not fit a dtype of
+    the same kind as a single value (such as ``[-1, 2**64 - 1]``, which NumPy
+    would store as floats) give ``object``.
+    """
+    types = {type(value) for value in values}
+    if len(types) == 1:
+        value_type, = types
+        if issubclass(value_type, (bool, int, float, complex, np.generic)):
+            try:
+                dtype = np.asarray(values).dtype
+            except OverflowError:
+                return np.dtype(object)
+            if (dtype.kind in 'biufc'
+                    and dtype.kind == np.asarray(values[:1]).dtype.kind):
+                return dtype
+    return np.dtype(object)
+
+
+def _as_array(values):
+    """Returns ``values`` as an array of the dtype found by ``_infer_dtype``,
+    with each list or dict value stored as one element."""
+    if isinstance(values, np.ndarray):
+        return values
+    values = list(values)
+    dtype = _infer_dtype(values)
+    array = np.empty(len(values), dtype=dtype)
+    if dtype.hasobject:
+        for row, value in enumerate(values):
+            array[row] = value
+    else:
+        array[:] = values
+    return array
+
+
+def _python_value(value):
+    """Converts NumPy scalars to the equivalent python object."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _changed_rows(old, new):
+    """Returns the indices of the rows where ``new`` differs from ``old``.
+
+    NaN is considered equal to NaN, and values that can not be compared are
+    considered to have changed.
+    """
+    try:
+        changed = np.asarray(old != new)
+        if changed.dtype != bool or changed.shape != old.shape:
+            raise ValueError
+    except ValueError:
+        changed = np.empty(len(old), dtype=bool)
+        for row, (old_value, new_value) in enumerate(zip(old, new)):
+            try:
+                changed[row] = bool(old_value != new_value)
+            except (TypeError, ValueError):
+                changed[row] = True
+    if old.dtype.kind in 'fc' and new.dtype.kind in 'fc':
+        changed &= ~(np.isnan(old) & np.isnan(new))
+    return np.flatnonzero(changed)
+
+
+def _column_length(columns):
+    """Returns the common length of the arrays in the ``columns`` dict."""
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError(f'the columns have different lengths: '
+                         f'{sorted(lengths)}')
+    return lengths.pop() if lengths else 0
+
+
+def _column_list(values):
+    """Returns the values of a column given as an array, pandas Series or
+    other sequence as a list of python objects."""
+    return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+
+def _move_order(first, count, destination):
+    """Returns the first row changed by moving ``count`` rows from ``first``
+    to before ``destination``, and the old rows in their new order from it.
+    """
+    block = np.arange(first, first + count)
+    if destination < first:
+        return destination, np.concatenate(
+            [block, np.arange(destination, first)])
+    return first, np.concatenate(
+        [np.arange(first + count, destination), block])
+
+
+def _can_move(parent, first, count, destination_parent, destination,
+              row_count):
+    """Checks the arguments of a ``moveRows`` call on a flat table."""
+    return (not parent.isValid() and not destination_parent.isValid()
+            and count > 0 and first >= 0 and first + count <= row_count
+            and 0 <= destination <= row_count
+            and not first <= destination <= first + count)
+
+
+class _PagedRows:
+    """Adds lazy loading of rows from an iterable, one page at a time, to a
+    model with ``set_rows`` and ``append_rows`` methods.
+
+    Views call ``fetchMore`` when they are scrolled to the last loaded row,
+    so only the rows that have been looked at are held by the model.
+    ``iter_unloaded`` reads the rest of the source without loading it, for
+    callers that only need the values, such as
+    ``MTableInterfaceView.get_parameters``.
+    """
+
+    _source = None
+    page_size = 1000
+
+    def set_source(self, rows, page_size=None):
+        """Replaces the contents of the model with the first page of
+        ``rows``, an iterable of dicts, the rest are loaded on demand."""
+        if page_size is not None:
+            self.page_size = page_size
+        source = iter(rows)
+        self.set_rows(list(islice(source, self.page_size)))
+        self._source = source
+        # rows read from the source by ``iter_unloaded`` but not loaded
+        self._read = []
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._source is not None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._source is None:
+            return
+        page = self._read[:self.page_size]
+        del self._read[:len(page)]
+        page.extend(islice(self._source, self.page_size - len(page)))
+        if len(page) < self.page_size:
+            self._source = None
+        if page:
+            self.append_rows(page)
+
+    def iter_unloaded(self):
+        """Yields the rows of the source that have not been loaded, as dicts.
+
+        The rows are not turned into items (or array elements), but as the
+        source can only be read once they are kept as the dicts it gave,
+        which ``fetchMore`` loads from first. So the table still holds every
+        row afterwards, at the cost of the dicts of the rows read past the
+        loaded ones. The model should not be fetched while iterating.
+        """
+        if self._source is None:
+            return
+        yield from list(self._read)
+        for row in self._source:
+            self._read.append(row)
+            yield row
+
+    def fetch_all(self):
+        """Loads all of the remaining rows from the source."""
+        while self.canFetchMore():
+            self.fetchMore()
+
+
+class MStandardItemModel(_PagedRows, QStandardItemModel):
+    """A ``QStandardItemModel`` with a bulk loading method.
+
+    This is the default model for ``MTableInterfaceView``. It adds a
+    ``set_rows`` method that replaces the contents of the model in one go,
+    rather than one ``appendRow`` (and one ``rowsInserted`` signal) per row,
+    a ``moveRows`` implementation that moves a block of rows in one operation
+    and the ``set_schema``, ``row_values``, ``set_columns`` (for loading a
+    dict of arrays) and ``set_source`` (for loading rows lazily from an
+    iterable) methods shared with ``MColumnarTableModel``.
+    """
+
+    schema = None
+
+    def set_schema(self, schema):
+        """Sets the columns of the model from an ``MTableSchema``."""
+        self.schema = schema
+        self.setHorizontalHeaderLabels(list(schema.names))
+
+    def moveRows(self, parent, first, count, destination_parent,
+                 destination):
+        """Moves ``count`` rows from ``first`` to before ``destination``.
+
+        The items are copied with the model's signals blocked inside a single
+        ``beginMoveRows``/``endMoveRows`` pair, so persistent indexes, and
+        with them the selection, follow the moved rows.
+        """
+        if not _can_move(parent, first, count, destination_parent,
+                         destination, self.rowCount()):
+            return False
+        if not self.beginMoveRows(QModelIndex(), first, first + count - 1,
+                                  QModelIndex(), destination):
+            return False
+        start, order = _move_order(first, count, destination)
+        blocked = self.blockSignals(True)
+        try:
+            columns = range(self.columnCount())
+            # copies of the items are moved, as taking them out of the model
+            # would invalidate the persistent indexes
+            items = {}
+            for row in order:
+                items[row] = []
+                for column in columns:
+                    item = self.item(row, column)
+                    items[row].append(item.clone() if item else QStandardItem())
+            for new_row, old_row in enumerate(order, start):
+                for column, item in zip(columns, items[old_row]):
+                    self.setItem(new_row, column, item)
+        finally:
+            self.blockSignals(blocked)
+        self.endMoveRows()
+        return True
+
+    def row_values(self, row):
+        """Returns the values of ``row`` as a list, in column order."""
+        values = []
+        for column in range(self.columnCount()):
+            item = self.item(row, column)
+            values.append(item.data(Qt.DisplayRole) if item else None)
+        return values
+
+    def column_values(self, column, rows=slice(None)):
+        """Returns the values of ``column`` as an array, optionally only
+        those in the ``rows`` slice."""
+        values = []
+        for row in range(self.rowCount())[rows]:
+            item = self.item(row, column)
+            values.append(item.data(Qt.DisplayRole) if item else None)
+        return _as_array(values)
+
+    def set_column_values(self, column, rows, values):
+        """Sets ``values`` to ``rows`` of ``column``.
+
+        The attached views are told about the change with a single
+        ``dataChanged`` signal spanning the rows.
+        """
+        if not len(rows):
+            return
+        blocked = self.blockSignals(True)
+        try:
+            for row, value in zip(rows, values):
+                row = int(row)
+                item = self.item(row, column)
+                if item is None:
+                    item = QStandardItem()
+                    self.setItem(row, column, item)
+                item.setData(_python_value(value), Qt.DisplayRole)
+        finally:
+            self.blockSignals(blocked)
+        self.dataChanged.emit(self.index(int(min(rows)), column),
+                              self.index(int(max(rows)), column),
+                              [Qt.DisplayRole, Qt.EditRole])
+
+    def set_rows(self, rows):
+        """Replaces the contents of the model with ``rows``.
+
+        The column names are looked up once, all of the rows are built with
+        the model's signals blocked and the attached views are then told
+        about the change with a single model reset.
+
+        Parameters
+        ----------
+        rows : [dicts]
+            List of dicts with each dict being a row that maps the column
+            header to its value.
+        """
+        row_values = self._row_values_getter()
+        self._reset_rows(row_values(row) for row in rows)
+
+    def set_columns(self, columns):
+        """Replaces the contents of the model with ``columns``.
+
+        Parameters
+        ----------
+        columns : dict or pandas.DataFrame
+            Maps the column headers to arrays (or other sequences) of values
+            of equal length. Columns that are not included are filled with
+            their default value.
+        """
+        headers = [self.headerData(column, Qt.Horizontal)
+                   for column in range(self.columnCount())]
+        given = {name: columns[name] for name in headers if name in columns}
+        length = _column_length(given)
+        values = []
+        for column, name in enumerate(headers):
+            if name in given:
+                values.append(_column_list(given[name]))
+            else:
+                default = self.schema[column].default if self.schema else None
+                values.append([default] * length)
+        self._reset_rows(zip(*values))
+
+    def _reset_rows(self, rows):
+        """Replaces the contents of the model with ``rows``, an iterable of
+        lists of values in column order, with a single model reset."""
+        self._source = None
+        self.beginResetModel()
+        blocked = self.blockSignals(True)
+        try:
+            self.removeRows(0, self.rowCount())
+            for values in rows:
+                row_data = []
+                for value in values:
+                    item = QStandardItem()
+                    item.setData(value, Qt.DisplayRole)
+                    row_data.append(item)
+                self.appendRow(row_data)
+        finally:
+            self.blockSignals(blocked)
+            self.endResetModel()
+
+    def append_rows(self, rows):
+        """Appends ``rows``, a list of dicts, to the model with a single
+        ``rowsInserted`` and a single ``dataChanged`` signal."""
+        row_values = self._row_values_getter()
+        first = self.rowCount()
+        self.insertRows(first, len(rows))
+        blocked = self.blockSignals(True)
+        try:
+            for row, parameters in enumerate(rows, first):
+                for column, value in enumerate(row_values(parameters)):
+                    item = QStandardItem()
+                    item.setData(value, Qt.DisplayRole)
+                    self.setItem(row, column, item)
+        finally:
+            self.blockSignals(blocked)
+        self.dataChanged.emit(
+            self.index(first, 0),
+            self.index(self.rowCount() - 1, self.columnCount() - 1),
+            [Qt.DisplayRole, Qt.EditRole])
+
+    def _row_values_getter(self):
+        """Returns a function converting a row dict to a list of values."""
+        if self.schema is not None:
+            return self.schema.row_values
+        headers = [self.headerData(column, Qt.Horizontal)
+                   for column in range(self.columnCount())]
+
+        def row_values(row):
+            return [row.get(header, None) for header in headers]
+        return row_values
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # rows that are not loaded yet have to be sorted too
+        self.fetch_all()
+        super().sort(column, order)
+
+
+class MColumnarTableModel(_PagedRows, QAbstractTableModel):
+    """An array-backed table model for use with ``MTableInterfaceView``.
+
+    This is an alternative to the default ``QStandardItemModel`` that stores
+    each column as a NumPy array, rather than one ``QStandardItem`` per cell,
+    so that tables with tens of thousands of rows are quick to build and use
+    little memory. Columns of numbers or booleans are stored in typed arrays,
+    and anything else in object arrays. Missing values (``None``) are tracked
+    with a separate mask per column, so they do not affect the column type.
+    A column is converted to an object array if a value that does not fit its
+    type is written to it.
+
+    It supports the ``QStandardItemModel`` methods used by
+    ``MTableInterfaceView`` (``setHorizontalHeaderLabels``) together with
+    the generic ``QAbstractItemModel`` API, including ``moveRows``, and adds
+    ``set_rows`` and ``set_columns`` for loading a whole table at once, from
+    rows or from a dict of arrays, and ``set_source`` for loading the rows of
+    a large iterable lazily, as the view is scrolled.
+
+    Parameters
+    ----------
+    parent : QObject, optional
+        The parent of the model, normally the view.
+    dtypes : dict, optional
+        An optional dict mapping column names to NumPy dtypes. Columns that
+        are not included have their type inferred from the data.
+    """
+
+    def __init__(self, parent=None, dtypes=None):
+        super().__init__(parent)
+        self.dtypes = dtypes or {}
+        self.schema = None
+        self._headers = []
+        self._columns = []
+        self._valid = []
+        self._rows = 0
+
+    # Qt model API
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        return self.value(index.row(), index.column())
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return False
+        self._store(index.row(), index.column(), value)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        return True
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            if 0 <= section < len(self._headers):
+                return self._headers[section]
+            return None
+        return section + 1
+
+    def flags(self, index):
+        # as for ``QStandardItemModel``, rows can be dragged and dropped
+        # anywhere, so that views with ``drag_rows=True`` can reorder them
+        if not index.isValid():
+            return Qt.ItemIsDropEnabled
+        return (Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+                | Qt.ItemIsDragEnabled | Qt.ItemIsDropEnabled)
+
+    def supportedDropActions(self):
+        return Qt.CopyAction | Qt.MoveAction
+
+    def insertRows(self, row, count, parent=QModelIndex()):
+        if parent.isValid() or count < 1 or not 0 <= row <= self._rows:
+            return False
+        self.beginInsertRows(QModelIndex(), row, row + count - 1)
+        for column, values in enumerate(self._columns):
+            blank = np.zeros(count, dtype=values.dtype)
+            if values.dtype.hasobject:
+                blank[:] = None
+            self._columns[column] = np.insert(values, row, blank)
+            self._valid[column] = np.insert(self._valid[column], row,
+                                            np.zeros(count, dtype=bool))
+        self._rows += count
+        self.endInsertRows()
+        return True
+
+    def removeRows(self, row, count, parent=QModelIndex()):
+        if (parent.isValid() or count < 1 or row < 0
+                or row + count > self._rows):
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row + count - 1)
+        remove = slice(row, row + count)
+        for column, values in enumerate(self._columns):
+            self._columns[column] = np.delete(values, remove)
+            self._valid[column] = np.delete(self._valid[column], remove)
+        self._rows -= count
+        self.endRemoveRows()
+        return True
+
+    def moveRows(self, parent, first, count, destination_parent,
+                 destination):
+        """Moves ``count`` rows from ``first`` to before ``destination``.
+
+        The rows are reordered with one slice assignment per column inside a
+        single ``beginMoveRows``/``endMoveRows`` pair.
+        """
+        if not _can_move(parent, first, count, destination_parent,
+                         destination, self._rows):
+            return False
+        if not self.beginMoveRows(QModelIndex(), first, first + count - 1,
+                                  QModelIndex(), destination):
+            return False
+        start, order = _move_order(first, count, destination)
+        changed = slice(start, start + len(order))
+        for column in range(len(self._columns)):
+            self._columns[column][changed] = self._columns[column][order]
+            self._valid[column][changed] = self._valid[column][order]
+        self.endMoveRows()
+        return True
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # rows that are not loaded yet have to be sorted too
+        self.fetch_all()
+        if not 0 <= column < len(self._columns) or not self._rows:
+            return
+        self.layoutAboutToBeChanged.emit()
+        values, valid = self._columns[column], self._valid[column]
+        rows = np.flatnonzero(valid)
+        if values.dtype.hasobject:
+            try:
+                keys = sorted(rows, key=values.__getitem__)
+            except TypeError:  # mixed types, fall back to their str's
+                keys = sorted(rows, key=lambda row: str(values[row]))
+            rows = np.array(keys, dtype=int)
+        else:
+            rows = rows[np.argsort(values[rows], kind='stable')]
+        if order == Qt.DescendingOrder:
+            rows = rows[::-1]
+        # rows without a value always go last
+        permutation = np.concatenate([rows, np.flatnonzero(~valid)])
+        self._permute(permutation)
+        self.layoutChanged.emit()
+
+    def _permute(self, permutation):
+        """Reorders all rows so that new row i is old row permutation[i]."""
+        for column in range(len(self._columns)):
+            self._columns[column] = self._columns[column][permutation]
+            self._valid[column] = self._valid[column][permutation]
+        new_rows = np.empty_like(permutation)
+        new_rows[permutation] = np.arange(len(permutation))
+        old_indexes = self.persistentIndexList()
+        new_indexes = [self.index(int(new_rows[index.row()]), index.column())
+                       for index in old_indexes]
+        self.changePersistentIndexList(old_indexes, new_indexes)
+
+    # QStandardItemModel compatible API
+    def setHorizontalHeaderLabels(self, labels):
+        """Sets the column names, creating empty columns for any new ones."""
+        columns = dict(zip(self._headers, zip(self._columns, self._valid)))
+        headers = list(labels)
+        new_columns, new_valid = [], []
+        for name in headers:
+            if name in columns:
+                values, valid = columns[name]
+            else:
+                dtype = np.dtype(self.dtypes.get(name, object))
+                values = np.zeros(self._rows, dtype=dtype)
+                if dtype.hasobject:
+                    values[:] = None
+                valid = np.zeros(self._rows, dtype=bool)
+            new_columns.append(values)
+            new_valid.append(valid)
+        self._replace(headers, self._rows, new_columns, new_valid)
+
+    def set_schema(self, schema):
+        """Sets the columns of the model from an ``MTableSchema``.
+
+        The dtypes in the schema are used for any column that was not given a
+        dtype when the model was created.
+        """
+        self.schema = schema
+        self.dtypes = {**schema.dtypes, **self.dtypes}
+        self.setHorizontalHeaderLabels(list(schema.names))
+
+    # columnar API
+    def value(self, row, column):
+        """Returns the value at ``row``, ``column`` as a python object."""
+        if not self._valid[column][row]:
+            return None
+        value = self._columns[column][row]
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+
+    def row_values(self, row):
+        """Returns the values of ``row`` as a list, in column order."""
+        return [self.value(row, column)
+                for column in range(len(self._columns))]
+
+    def column_array(self, column):
+        """Returns the values of ``column`` and the mask of those that are
+        set, as a tuple of arrays."""
+        return self._columns[column], self._valid[column]
+
+    def column_values(self, column, rows=slice(None)):
+        """Returns a copy of the values of ``column``, optionally only those
+        in the ``rows`` slice, as an array. This is an object array with
+        ``None`` for the missing values if there are any."""
+        values = self._columns[column][rows]
+        valid = self._valid[column][rows]
+        if values.dtype.hasobject or valid.all():
+            return values.copy()
+        values = values.astype(object)
+        values[~valid] = None
+        return values
+
+    def set_column_values(self, column, rows, values):
+        """Sets ``values`` to ``rows`` of ``column``.
+
+        Values that fit the type of the column are written in one vectorized
+        assignment, and the attached views are told about the change with a
+        single ``dataChanged`` signal spanning the rows.
+        """
+        rows = np.asarray(rows, dtype=int)
+        if not len(rows):
+            return
+        values = _as_array(values)
+        array = self._columns[column]
+        if not array.dtype.hasobject and _array_fits(values, array.dtype):
+            array[rows] = values
+            self._valid[column][rows] = True
+        else:
+            for row, value in zip(rows, values):
+                self._store(row, column, _python_value(value))
+        self.dataChanged.emit(self.index(int(rows.min()), column),
+                              self.index(int(rows.max()), column),
+                              [Qt.DisplayRole, Qt.EditRole])
+
+    def set_rows(self, rows):
+        """Replaces the contents of the model with ``rows``.
+
+        Builds every column in one pass and resets the model once.
+
+        Parameters
+        ----------
+        rows : [dicts]
+            List of dicts with each dict being a row that maps the column
+            header to its value.
+        """
+        built = [self._build_column(column, rows)
+                 for column in range(len(self._headers))]
+        self._source = None
+        self._replace(self._headers, len(rows),
+                      [array for array, _ in built],
+                      [valid for _, valid in built])
+
+    def set_columns(self, columns):
+        """Replaces the contents of the model with ``columns``.
+
+        Typed arrays are stored as they are (converted to the dtype of the
+        column, if it was given and they fit it), so no per-value work is
+        done for them.
+
+        Parameters
+        ----------
+        columns : dict or pandas.DataFrame
+            Maps the column headers to arrays (or other sequences) of values
+            of equal length. Columns that are not included are filled with
+            their default value.
+        """
+        given = {name: columns[name] for name in self._headers
+                 if name in columns}
+        length = _column_length(given)
+        built = [self._array_column(column, given[name]) if name in given
+                 else self._build_column(column, [{}] * length)
+                 for column, name in enumerate(self._headers)]
+        self._source = None
+        self._replace(self._headers, length,
+                      [array for array, _ in built],
+                      [valid for _, valid in built])
+
+    def _replace(self, headers, rows, columns, valid):
+        """Replaces the contents of the model, built beforehand so that a
+        failure leaves it unchanged, with a single model reset."""
+        self.beginResetModel()
+        try:
+            self._headers = headers
+            self._rows = rows
+            self._columns = columns
+            self._valid = valid
+        finally:
+            self.endResetModel()
+
+    def append_rows(self, rows):
+        """Appends ``rows``, a list of dicts, to the model.
+
+        Each column of the new rows is built as in ``set_rows`` and joined to
+        the existing one, which is converted to an object array if the new
+        values do not fit its type.
+        """
+        first = self._rows
+        built = [self._build_column(column, rows)
+                 for column in range(len(self._headers))]
+        new_columns, new_valid = [], []
+        for column, (array, valid) in enumerate(built):
+            values = self._columns[column]
+            if not valid.any():
+                array = np.zeros(len(rows), dtype=values.dtype)
+                if values.dtype.hasobject:
+                    array[:] = None
+            elif not _array_fits(array[valid], values.dtype):
+                values = values.astype(object)
+                values[~self._valid[column]] = None
+            if values.dtype.hasobject and not array.dtype.hasobject:
+                array = array.astype(object)
+                array[~valid] = None
+            else:
+                array = array.astype(values.dtype, copy=False)
+            new_columns.append(np.concatenate([values, array]))
+            new_valid.append(np.concatenate([self._valid[column], valid]))
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        try:
+            self._columns, self._valid = new_columns, new_valid
+            self._rows += len(rows)
+        finally:
+            self.endInsertRows()
+
+    def _build_column(self, column, rows):
+        """Returns the values of ``column`` in ``rows``, a list of dicts, as
+        an array and the mask of those that are set."""
+        name = self._headers[column]
+        default = self.schema[column].default if self.schema else None
+        return self._list_column(column, [row.get(name, default)
+                                          for row in rows])
+
+    def _array_column(self, column, values):
+        """Returns ``values``, the contents of ``column`` as an array or other
+        sequence, as an array and the mask of those that are set."""
+        if hasattr(values, '__array__'):
+            values = np.asarray(values)
+        else:
+            values = _as_array(values)
+        if values.ndim != 1:
+            raise ValueError(f'the values of column '
+                             f'{self._headers[column]!r} are not 1d')
+        if values.dtype.kind not in 'biufc':
+            # objects, strings, dates... have to be checked one by one
+            return self._list_column(column, values.tolist())
+        valid = np.ones(len(values), dtype=bool)
+        dtype = self.dtypes.get(self._headers[column])
+        if dtype is not None and _array_fits(values, np.dtype(dtype)):
+            return values.astype(dtype), valid
+        elif dtype is not None:
+            return values.astype(object), valid
+        return values.copy(), valid
+
+    def _list_column(self, column, values):
+        """Returns ``values``, the contents of ``column`` as a list, as an
+        array and the mask of those that are set."""
+        name = self._headers[column]
+        valid = np.array([value is not None for value in values], dtype=bool)
+        present = [value for value in values if value is not None]
+        dtype = _infer_dtype(present)
+        converted = None
+        if not dtype.hasobject:
+            converted = np.asarray(present, dtype=dtype)
+        if name in self.dtypes:
+            given = np.dtype(self.dtypes[name])
+            if not present or (converted is not None
+                               and _array_fits(converted, given)):
+                dtype = given
+            else:
+                dtype = np.dtype(object)
+        array = np.zeros(len(values), dtype=dtype)
+        if not dtype.hasobject:
+            if present:
+                array[valid] = converted
+        else:
+            # assign one by one, so that list values are not broadcast
+            for row, value in enumerate(values):
+                array[row] = value
+        return array, valid
+
+    def _store(self, row, column, value):
+        if value is None:
+            self._valid[column][row] = False
+            if self._columns[column].dtype.hasobject:
+                self._columns[column][row] = None
+            return
+        values = self._columns[column]
+        if not _fits(value, values.dtype):
+            values = values.astype(object)
+            values[~self._valid[column]] = None
+            self._columns[column] = values
+        values[row] = value
+        self._valid[column][row] = True
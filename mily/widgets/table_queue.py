@@ -0,0 +1,239 @@
+import time
+
+from qtpy.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer, Signal
+
+from ..utils.threads import QThreadFuture
+
+
+QUEUED, RUNNING, DONE, FAILED, ABORTED = (
+    'queued', 'running', 'done', 'failed', 'aborted')
+
+
+class _Entry:
+    """One queued call of the function."""
+
+    __slots__ = ('label', 'parameters', 'status', 'started', 'elapsed',
+                 'result', 'error', 'completed')
+
+    def __init__(self, label, parameters):
+        self.label = label
+        self.parameters = parameters
+        self.status = QUEUED
+        self.started = None
+        self.elapsed = None
+        self.result = None
+        self.error = None
+        self.completed = False
+
+
+class MExecutionQueue(QAbstractTableModel):
+    """A queue of calls of ``function``, run in order on a background thread.
+
+    Each call is an entry of the queue, with the keyword arguments it is
+    called with, and a row of this model showing its label (such as the
+    table row it came from), status (one of 'queued', 'running', 'done',
+    'failed' or 'aborted') and elapsed time in seconds. The elapsed time of
+    the running call is refreshed every ``interval`` milliseconds.
+
+    Entries are run one at a time, each in a ``QThreadFuture``, so the GUI
+    stays responsive. Pausing the queue lets the running call finish and
+    holds the rest, aborting it asks the running call to stop (see
+    ``mily.utils.threads.cancellation_requested``) and drops the rest. The
+    dropped calls, and a call stopped before it started, are 'aborted',
+    while a call that returned is 'done' whether or not it was asked to
+    stop.
+
+    Parameters
+    ----------
+    function : callable
+        The function to call with the keyword arguments of each entry.
+    parent : QObject, optional
+        The parent of the model.
+    interval : int, optional
+        The refresh interval of the elapsed time, in milliseconds.
+    """
+
+    sigStarted = Signal(int)  # the entry
+    sigFinished = Signal(int)  # the entry, in any status
+    sigIdle = Signal()  # the queue has no running call
+
+    headers = ('row', 'status', 'elapsed')
+
+    def __init__(self, function, parent=None, interval=100):
+        super().__init__(parent)
+        self.function = function
+        self.entries = []
+        self.future = None
+        self._entry = None
+        self._next = 0
+        self._paused = False
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self._refresh_elapsed)
+
+    # Qt model API
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self.entries[index.row()]
+        if role == Qt.ToolTipRole and entry.error is not None:
+            return f'{type(entry.error).__name__}: {entry.error}'
+        if role != Qt.DisplayRole:
+            return None
+        column = index.column()
+        if column == 0:
+            return entry.label
+        elif column == 1:
+            return entry.status
+        elapsed = self.elapsed(index.row())
+        return None if elapsed is None else f'{elapsed:.1f} s'
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.headers[section]
+        return section + 1
+
+    # queue API
+    @property
+    def paused(self):
+        return self._paused
+
+    @property
+    def running(self):
+        """``True`` while a call is running."""
+        return self.future is not None
+
+    @property
+    def pending(self):
+        """The number of queued calls that have not started."""
+        return len(self.entries) - self._next
+
+    def status(self, entry):
+        return self.entries[entry].status
+
+    def elapsed(self, entry):
+        """Returns the elapsed time of ``entry`` in seconds, ``None`` if it
+        has not started."""
+        entry = self.entries[entry]
+        if entry.elapsed is not None:
+            return entry.elapsed
+        if entry.started is not None:
+            return time.monotonic() - entry.started
+        return None
+
+    def enqueue(self, label, parameters):
+        """Adds a call with the ``parameters`` dict as keyword arguments to
+        the end of the queue, and starts it if the queue is idle."""
+        row = len(self.entries)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.entries.append(_Entry(label, dict(parameters)))
+        self.endInsertRows()
+        self._run_next()
+
+    def pause(self, paused=True):
+        """Holds the queued calls, or releases them if ``paused`` is
+        ``False``. A running call is not interrupted."""
+        self._paused = paused
+        if not paused:
+            self._run_next()
+
+    def resume(self):
+        self.pause(False)
+
+    def abort(self):
+        """Asks the running call to stop and drops the queued ones."""
+        for row in range(self._next, len(self.entries)):
+            self.entries[row].status = ABORTED
+        self._next = len(self.entries)
+        if self.future is not None:
+            self.future.request_cancel()
+        self._entries_changed(0, len(self.entries) - 1)
+        if self.future is None:
+            self.sigIdle.emit()
+
+    def clear(self):
+        """Removes the entries that are no longer queued or running."""
+        keep = self.entries[self._next - (self.future is not None):]
+        if len(keep) == len(self.entries):
+            return
+        self.beginResetModel()
+        self._next -= len(self.entries) - len(keep)
+        self.entries = keep
+        self.endResetModel()
+
+    def _run_next(self):
+        if (self._paused or self.future is not None
+                or self._next >= len(self.entries)):
+            return
+        row = self._next
+        self._next += 1
+        entry = self.entries[row]
+        entry.status = RUNNING
+        entry.started = time.monotonic()
+        self._entry = entry
+        # the thread manager holds on to the future until its thread ends
+        self.future = QThreadFuture(self._call, entry, showBusy=False)
+        # ``finished`` is emitted however the thread ends, including when it
+        # is aborted before the call starts
+        self.future.finished.connect(self._finished)
+        self._entries_changed(row, row)
+        self._timer.start()
+        self.sigStarted.emit(row)
+        self.future.start()
+        if self.future.cancelled:
+            # threads are shutting down, so none of the calls can start
+            self.abort()
+            self._finished()
+
+    def _call(self, entry):
+        """Runs ``entry`` on the worker thread."""
+        try:
+            entry.result = self.function(**entry.parameters)
+            entry.completed = True
+        except Exception as ex:
+            entry.error = ex
+            raise
+        finally:
+            entry.elapsed = time.monotonic() - entry.started
+
+    def _finished(self):
+        entry, self._entry = self._entry, None
+        if entry.elapsed is None:
+            entry.elapsed = time.monotonic() - entry.started
+        # entries may have been cleared since the call started
+        row = self.entries.index(entry)
+        # a call that returned is done even if it was asked to stop, as the
+        # function may not check for it or abort may come after it returned
+        if entry.error is not None:
+            entry.status = FAILED
+        elif entry.completed:
+            entry.status = DONE
+        else:
+            entry.status = ABORTED
+        self.future = None
+        self._timer.stop()
+        self._entries_changed(row, row)
+        self.sigFinished.emit(row)
+        self._run_next()
+        if self.future is None:
+            self.sigIdle.emit()
+
+    def _refresh_elapsed(self):
+        if self.future is not None:
+            row = self._next - 1
+            self.dataChanged.emit(self.index(row, 2), self.index(row, 2),
+                                  [Qt.DisplayRole])
+
+    def _entries_changed(self, first, last):
+        if last >= first:
+            self.dataChanged.emit(self.index(first, 0),
+                                  self.index(last, self.columnCount() - 1),
+                                  [Qt.DisplayRole])
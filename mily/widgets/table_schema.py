@@ -0,0 +1,78 @@
+from collections import namedtuple
+
+import numpy as np
+
+from .widgets import MText
+
+
+MTableColumn = namedtuple('MTableColumn',
+                          ['name', 'index', 'editor', 'dtype', 'default'])
+MTableColumn.__doc__ = """The description of one column of an ``MTableSchema``.
+
+``editor`` is the editor factory for the column (``MText`` if none was
+given), ``dtype`` the NumPy dtype to store it with (``None`` to infer it) and
+``default`` the value of the column in new rows."""
+
+
+class MTableSchema:
+    """The compiled description of the columns of a table.
+
+    This is built once from the editor map of an ``MTableInterfaceWidget``
+    and shared by its view, delegate and model, so that the column order,
+    editor, dtype and default of every column are known up front and column
+    names and indices can be converted in O(1).
+
+    Parameters
+    ----------
+    editor_map : OrderedDict
+        An OrderedDict that maps column names to editor widgets, in column
+        order.
+    dtypes : dict, optional
+        An optional dict mapping column names to NumPy dtypes.
+    defaults : dict, optional
+        An optional dict mapping column names to the values of the column in
+        new rows, ``None`` for columns that are not included.
+    """
+
+    def __init__(self, editor_map, dtypes=None, defaults=None):
+        dtypes = dtypes or {}
+        defaults = defaults or {}
+        self.columns = tuple(
+            MTableColumn(name, column, editor or MText,
+                         np.dtype(dtypes[name]) if name in dtypes else None,
+                         defaults.get(name, None))
+            for column, (name, editor) in enumerate(editor_map.items()))
+        self.names = tuple(column.name for column in self.columns)
+        self.index = {column.name: column.index for column in self.columns}
+
+    def __len__(self):
+        return len(self.columns)
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def __getitem__(self, key):
+        """Returns the ``MTableColumn`` for a column name or index."""
+        if isinstance(key, str):
+            key = self.index[key]
+        return self.columns[key]
+
+    @property
+    def dtypes(self):
+        """A dict mapping column names to the dtypes that were given."""
+        return {column.name: column.dtype for column in self.columns
+                if column.dtype is not None}
+
+    def default_row(self):
+        """Returns the values of a new row as a list, in column order."""
+        return [column.default for column in self.columns]
+
+    def row_values(self, parameters):
+        """Returns the values in the ``parameters`` dict as a list, in column
+        order, using the column defaults for missing values."""
+        return [parameters.get(column.name, column.default)
+                for column in self.columns]
+
+    def row_dict(self, values):
+        """Returns a dict mapping the column names to ``values``."""
+        return dict(zip(self.names, values))
@@ -0,0 +1,215 @@
+from contextlib import contextmanager
+import sys
+
+from qtpy.QtCore import QObject, Signal
+
+
+def _size(diff):
+    """Estimates the memory used by ``diff`` in bytes."""
+    size = sys.getsizeof(diff)
+    kind = diff[0]
+    if kind == 'cells':
+        _, column, rows, values = diff
+        size += rows.nbytes + sys.getsizeof(values)
+        size += sum(sys.getsizeof(value) for value in values)
+    elif kind == 'insert':
+        _, row, rows = diff
+        size += sys.getsizeof(rows)
+        size += sum(sys.getsizeof(values) + sum(sys.getsizeof(value)
+                                                for value in values)
+                    for values in rows)
+    return size
+
+
+class _Command:
+    """A named list of diffs that are undone (or redone) together."""
+
+    def __init__(self, text):
+        self.text = text
+        self.diffs = []
+        self.size = 0
+        # the diffs are dropped once they use more than the memory cap
+        self.too_large = False
+
+
+class MTableUndoStack(QObject):
+    """An undo/redo stack of diffs for an ``MTableInterfaceView``.
+
+    Rather than a snapshot of the table, each command stores the diffs needed
+    to reverse it, which are one of:
+
+        ('cells', column, rows, values): sets ``values`` to ``rows`` of
+            ``column``.
+        ('insert', row, rows): inserts ``rows``, a list of lists of values,
+            at ``row``.
+        ('remove', row, count): removes ``count`` rows from ``row``.
+        ('move', first, count, destination): moves ``count`` rows from
+            ``first`` to before ``destination``.
+
+    Applying a diff returns the diff that reverses it, so undoing a command
+    turns it into its redo command and vice versa. The view records the diffs
+    for the changes made through its methods, and changes made inside
+    ``with stack.command(text):`` are undone as a single command. The oldest
+    commands are dropped once the commands use more than ``max_bytes``. A
+    single command using more than that is not recorded and clears the
+    stack, as the older commands can not be undone past it.
+
+    Sorting or resetting the model clears the stack, as the recorded row
+    numbers no longer apply.
+
+    Parameters
+    ----------
+    view : MTableInterfaceView
+        The view whose changes are recorded.
+    max_bytes : int, optional
+        The memory cap in bytes, 0 disables recording.
+    """
+
+    sigChanged = Signal()
+
+    def __init__(self, view, max_bytes=2 ** 26):
+        super().__init__(view)
+        self.view = view
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._undo = []
+        self._redo = []
+        self._current = None
+        self._depth = 0
+        self._paused = 0
+
+    @property
+    def recording(self):
+        """``True`` if changes are being recorded."""
+        return bool(self.max_bytes) and not self._paused
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo_text(self):
+        return self._undo[-1].text if self._undo else ''
+
+    def redo_text(self):
+        return self._redo[-1].text if self._redo else ''
+
+    @contextmanager
+    def command(self, text):
+        """Records the changes made inside the block as a single command.
+
+        Commands can be nested, in which case the outermost one is used.
+        """
+        self._depth += 1
+        if self._depth == 1:
+            self._current = _Command(text)
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                command, self._current = self._current, None
+                if command.diffs or command.too_large:
+                    self._push(command)
+
+    @contextmanager
+    def paused(self):
+        """Stops recording changes inside the block."""
+        self._paused += 1
+        try:
+            yield
+        finally:
+            self._paused -= 1
+
+    def record(self, diff):
+        """Records ``diff``, the reverse of a change made to the view."""
+        if not self.recording:
+            return
+        command = self._current
+        if command is None:
+            command = _Command('edit')
+        if not command.too_large:
+            command.diffs.append(diff)
+            command.size += _size(diff)
+            if command.size > self.max_bytes:
+                command.too_large = True
+                command.diffs = []
+                command.size = 0
+        if self._current is None:
+            self._push(command)
+
+    def _push(self, command):
+        if command.too_large:
+            self.clear()
+            return
+        self.size -= sum(redo.size for redo in self._redo)
+        self._redo.clear()
+        self._undo.append(command)
+        self.size += command.size
+        self._trim()
+        self.sigChanged.emit()
+
+    def _trim(self):
+        """Drops the oldest commands while over ``max_bytes``, which the
+        newest one is not."""
+        while self.size > self.max_bytes:
+            self.size -= self._undo.pop(0).size
+
+    def undo(self):
+        """Undoes the last command."""
+        if self._undo:
+            self._apply(self._undo.pop(), self._redo)
+
+    def redo(self):
+        """Redoes the last undone command."""
+        if self._redo:
+            self._apply(self._redo.pop(), self._undo)
+
+    def _apply(self, command, target):
+        reverse = _Command(command.text)
+        with self.paused():
+            for diff in reversed(command.diffs):
+                inverse = self.apply(diff)
+                reverse.diffs.append(inverse)
+                reverse.size += _size(inverse)
+        self.size += reverse.size - command.size
+        target.append(reverse)
+        self.sigChanged.emit()
+
+    def apply(self, diff):
+        """Applies ``diff`` to the view and returns the diff reversing it."""
+        view = self.view
+        kind = diff[0]
+        if kind == 'cells':
+            _, column, rows, values = diff
+            old = [view.model().index(int(row), column).data()
+                   for row in rows]
+            view.set_cells(column, rows, values)
+            return ('cells', column, rows, old)
+        elif kind == 'insert':
+            _, row, rows = diff
+            view.insert_rows(row, rows)
+            return ('remove', row, len(rows))
+        elif kind == 'remove':
+            _, row, count = diff
+            rows = [view.row_values(row) for row in range(row, row + count)]
+            view.remove_rows(row, count)
+            return ('insert', row, rows)
+        elif kind == 'move':
+            _, first, count, destination = diff
+            new_first = view.move_rows(first, count, destination)
+            back = first if first < new_first else first + count
+            return ('move', new_first, count, back)
+        raise ValueError(f'unknown diff {kind!r}')
+
+    def clear(self, *args):
+        """Empties the stack."""
+        if self._undo or self._redo:
+            self._undo.clear()
+            self._redo.clear()
+            self.size = 0
+            self.sigChanged.emit()
+
+    def __len__(self):
+        return len(self._undo)
@@ -0,0 +1,554 @@
+from collections import OrderedDict
+import threading
+import time
+
+import numpy as np
+import pytest
+from qtpy.QtCore import Qt, QEvent, QItemSelectionModel, QMimeData, QPoint
+from qtpy.QtGui import QDropEvent, QMouseEvent, QStandardItemModel
+from qtpy.QtWidgets import QApplication, QStyledItemDelegate
+
+from mily.utils import threads
+from mily.widgets import (MTableItemDelegate, MTableInterfaceWidget,
+                          MFunctionTableInterfaceWidget, MStandardItemModel,
+                          MColumnarTableModel, MText, MISpin, MFSpin)
+
+
+ROWS = [{'label': 'a', 'count': 1, 'value': 1.5},
+        {'label': 'b', 'count': 2, 'value': 2.5},
+        {'label': 'c', 'count': 3, 'value': None}]
+
+
+EDITOR_MAP = OrderedDict([('label', MText), ('count', MISpin),
+                          ('value', MFSpin)])
+
+
+@pytest.fixture
+def make_table(qtbot):
+    """Returns a function creating a widget (an ``MTableInterfaceWidget`` by
+    default) named 'table' with the ``EDITOR_MAP`` columns, the ``prefix``
+    parameters and ``rows``, passing any other arguments to it."""
+    def make_table(*args, widget=MTableInterfaceWidget, rows=ROWS,
+                   prefix=None, **kwargs):
+        widget = widget(*args, 'table', table_editor_map=EDITOR_MAP,
+                        default_parameters=[prefix or {}, *rows, {}],
+                        **kwargs)
+        qtbot.addWidget(widget)
+        return widget
+    return make_table
+
+
+@pytest.fixture(params=[QStandardItemModel, MStandardItemModel,
+                        MColumnarTableModel])
+def table(request, make_table):
+    return make_table(model=request.param)
+
+
+def select_rows(widget, *rows):
+    view = widget.tableView
+    view.clearSelection()
+    for row in rows:
+        view.selectionModel().select(
+            view.model().index(row, 0),
+            QItemSelectionModel.Select | QItemSelectionModel.Rows)
+
+
+def labels(widget):
+    return [row['label'] for row in widget.get_parameters()['table'][1:-1]]
+
+
+def test_set_default_get_parameters(table):
+    assert table.get_parameters()['table'] == [{}, *ROWS, {}]
+    rows = [{'label': 'a', 'count': 1, 'value': 2 ** 70},
+            {'label': 'b', 'count': 2 ** 70, 'value': -1}]
+    table.set_default([{}, *rows, {}])
+    assert table.get_parameters()['table'] == [{}, *rows, {}]
+
+
+def test_row_manipulation(table):
+    select_rows(table, 0)
+    table._downRow()
+    assert labels(table) == ['b', 'a', 'c']
+    select_rows(table, 2)
+    table._upRow()
+    assert labels(table) == ['b', 'c', 'a']
+    select_rows(table, 0)
+    table._duplicateRow()
+    assert labels(table) == ['b', 'b', 'c', 'a']
+    select_rows(table, 1)
+    table._delRow()
+    assert labels(table) == ['b', 'c', 'a']
+    select_rows(table, 0)
+    table._addRow()
+    assert labels(table) == ['b', None, 'c', 'a']
+
+
+def test_block_row_manipulation(table):
+    table.set_default([{}, *[{'label': label} for label in 'abcdef'], {}])
+    select_rows(table, 1, 2, 4)
+    table._duplicateRow()
+    assert labels(table) == ['a', 'b', 'c', 'b', 'c', 'd', 'e', 'e', 'f']
+    select_rows(table, 1, 2)
+    table._upRow()
+    assert labels(table) == ['b', 'c', 'a', 'b', 'c', 'd', 'e', 'e', 'f']
+    select_rows(table, 0, 1, 7)
+    table._downRow()
+    assert labels(table) == ['a', 'b', 'c', 'b', 'c', 'd', 'e', 'f', 'e']
+    select_rows(table, 0, 1, 2, 5)
+    table._delRow()
+    assert labels(table) == ['b', 'c', 'e', 'f', 'e']
+
+
+def test_block_moves_keep_selection(table):
+    table.set_default([{}, *[{'label': label} for label in 'abcdef'], {}])
+    view = table.tableView
+    select_rows(table, 2, 3)
+    table._upRow()
+    assert labels(table) == ['a', 'c', 'd', 'b', 'e', 'f']
+    assert view.selected_blocks() == [(1, 2)]
+    table._downRow()
+    table._downRow()
+    assert labels(table) == ['a', 'b', 'e', 'c', 'd', 'f']
+    assert view.selected_blocks() == [(3, 4)]
+
+    select_rows(table, 0, 4, 5)
+    assert view.move_blocks(view.selected_blocks(), 3) == [0, 1, 2, 3, 4, 5]
+    assert labels(table) == ['b', 'e', 'a', 'd', 'f', 'c']
+
+
+class _DropEvent(QDropEvent):
+    """A drop from ``source``, which Qt only reports during a real drag."""
+
+    def __init__(self, source, pos):
+        self._mime_data = QMimeData()
+        super().__init__(pos, Qt.MoveAction, self._mime_data, Qt.LeftButton,
+                         Qt.NoModifier)
+        self._source = source
+
+    def source(self):
+        return self._source
+
+
+@pytest.mark.parametrize('model', [MStandardItemModel, MColumnarTableModel])
+def test_drag_rows(model, make_table, monkeypatch):
+    widget = make_table(model=model, drag_rows=True,
+                        rows=[{'label': label} for label in 'abcd'])
+    view = widget.tableView
+    widget.show()
+    dropped = []
+    view.rowsDropped.connect(dropped.append)
+
+    def drag(supported_actions):
+        # drop the dragged rows on the top half of the last row
+        rect = view.visualRect(view.model().index(3, 0))
+        view.dropEvent(_DropEvent(view, rect.topLeft() + QPoint(1, 1)))
+    monkeypatch.setattr(view, 'startDrag', drag)
+
+    select_rows(widget, 0, 1)
+    start = view.visualRect(view.model().index(0, 0)).center()
+    end = start + QPoint(0, 4 * QApplication.startDragDistance())
+    # the first move enters the dragging state, the second starts the drag
+    for event_type, pos, button in [
+            (QEvent.MouseButtonPress, start, Qt.LeftButton),
+            (QEvent.MouseMove, start + QPoint(0, 1), Qt.NoButton),
+            (QEvent.MouseMove, end, Qt.NoButton),
+            (QEvent.MouseButtonRelease, end, Qt.LeftButton)]:
+        QApplication.sendEvent(view.viewport(), QMouseEvent(
+            event_type, pos, button, Qt.LeftButton, Qt.NoModifier))
+    assert labels(widget) == ['c', 'a', 'b', 'd']
+    assert dropped == [[0, 1, 2]]
+    assert view.selected_blocks() == [(1, 2)]
+
+
+def test_undo_redo(table):
+    view = table.tableView
+    stack = view.undo_stack
+    assert not stack.can_undo() and not table.undoBtn.isEnabled()
+    select_rows(table, 0, 1)
+    table._delRow()
+    table._addRow()
+    select_rows(table, 1)
+    table._upRow()
+    with stack.command('edit'):
+        view.set_cells(2, [0, 1], [10.5, 11.5])
+    assert len(stack) == 4 and table.undoBtn.isEnabled()
+    edited = table.get_parameters()
+
+    for _ in range(4):
+        table.undo()
+    assert table.get_parameters()['table'] == [{}, *ROWS, {}]
+    assert not stack.can_undo() and stack.redo_text() == 'delete rows'
+    for _ in range(4):
+        table.redo()
+    assert table.get_parameters() == edited
+
+    table.undo()
+    select_rows(table, 0)
+    table._duplicateRow()
+    assert not stack.can_redo()
+    table.set_default([{}, *ROWS, {}])
+    assert not stack.can_undo() and stack.size == 0
+
+
+def test_undo_memory_cap(make_table):
+    widget = make_table(undo_limit=5000)
+    stack = widget.tableView.undo_stack
+    for _ in range(100):
+        widget._addRow()
+    kept = len(stack)
+    assert 1 < kept < 100 and stack.size <= 5000
+    while stack.can_undo():
+        widget.undo()
+    # only the rows added by the commands that were kept are removed
+    assert widget.tableView.model().rowCount() == 3 + 100 - kept
+    assert stack.can_redo()
+
+
+def test_undo_command_over_cap(make_table):
+    rows = [{'label': str(row), 'count': row, 'value': 0.5}
+            for row in range(100)]
+    widget = make_table(undo_limit=5000, rows=rows)
+    view = widget.tableView
+    stack = view.undo_stack
+    view.set_cells(1, [0], [7])
+    assert stack.can_undo()
+    # removing every row records them all, far more than the cap
+    view.remove_rows(0, 100)
+    assert not stack.can_undo() and not stack.can_redo()
+    assert stack.size == 0
+    widget._addRow()
+    assert len(stack) == 1
+
+
+@pytest.mark.parametrize('model', [MStandardItemModel, MColumnarTableModel])
+def test_lazy_source(model, make_table):
+    def source():
+        for row in range(2500):
+            pulled.append(row)
+            yield {'label': str(row), 'count': row if row < 2000 else 'many',
+                   'value': row / 2}
+
+    pulled = []
+    widget = make_table(model=model, rows=[])
+    widget.set_table_source(source(), page_size=1000)
+    view = widget.tableView
+    assert view.model().rowCount() == 1000 and len(pulled) == 1000
+    assert view.model().canFetchMore(view.rootIndex())
+
+    rows = view.iter_rows()
+    assert [next(rows) for _ in range(1001)][-1]['label'] == '1000'
+    assert view.model().rowCount() == 1000 and len(pulled) == 1001
+    view.model().fetchMore(view.rootIndex())
+    assert view.model().rowCount() == 2000 and len(pulled) == 2000
+
+    # the rest of the source is read without loading it into the model
+    parameters = view.get_parameters()[view._name]
+    assert len(parameters) == 2500 and len(pulled) == 2500
+    assert view.model().rowCount() == 2000
+    assert parameters[1999] == {'label': '1999', 'count': 1999,
+                                'value': 999.5}
+    assert parameters[2000]['count'] == 'many'
+    assert view.get_parameters()[view._name] == parameters
+
+    view.model().fetch_all()
+    assert view.model().rowCount() == 2500 and len(pulled) == 2500
+    assert not view.model().canFetchMore(view.rootIndex())
+    assert view.get_parameters()[view._name] == parameters
+
+
+@pytest.mark.parametrize('extension', ['.csv', '.jsonl', '.parquet'])
+def test_import_export(table, tmp_path, extension):
+    if extension == '.parquet':
+        pytest.importorskip('pyarrow')
+    path = str(tmp_path / ('scan' + extension))
+    rows = [*ROWS, {'label': '7', 'count': None, 'value': 0.5}]
+    table.set_default([{}, *rows, {}])
+    table.export_table(path)
+    table.set_default([{}, {}])
+    assert labels(table) == []
+    table.import_table(path)
+    assert table.get_parameters()['table'] == [{}, *rows, {}]
+
+
+@pytest.mark.parametrize('model', [MStandardItemModel, MColumnarTableModel])
+def test_import_streams_rows(model, make_table, tmp_path):
+    path = tmp_path / 'scan.csv'
+    rows = [{'label': str(row), 'count': row, 'value': row / 2}
+            for row in range(2500)]
+    widget = make_table(model=model, rows=rows)
+    widget.export_table(str(path))
+    path.write_text('# exported for sample 3\n' + path.read_text())
+    widget.set_default([{}, {}])
+
+    widget.import_table(str(path), page_size=1000)
+    assert widget.tableView.model().rowCount() == 1000
+    assert widget.get_parameters()['table'] == [{}, *rows, {}]
+
+
+def test_get_set_columns(table):
+    columns = table.get_table_columns()
+    assert list(columns) == ['label', 'count', 'value']
+    assert list(columns['count']) == [1, 2, 3]
+    assert list(columns['value']) == [1.5, 2.5, None]
+
+    table.set_table_columns({'label': np.array(['x', 'y']),
+                             'value': np.array([0.5, 1.5])})
+    assert table.get_parameters()['table'] == [
+        {}, {'label': 'x', 'count': None, 'value': 0.5},
+        {'label': 'y', 'count': None, 'value': 1.5}, {}]
+    assert table.get_table_columns()['value'].dtype.kind == 'f'
+
+    table.set_table_columns(columns)
+    assert table.get_parameters()['table'] == [{}, *ROWS, {}]
+    with pytest.raises(ValueError):
+        table.set_table_columns({'label': ['x'], 'count': [1, 2]})
+
+    pandas = pytest.importorskip('pandas')
+    frame = table.get_table_columns(as_frame=True)
+    assert isinstance(frame, pandas.DataFrame) and len(frame) == 3
+    table.set_table_columns(frame)
+    assert table.get_parameters()['table'] == [{}, *ROWS, {}]
+
+
+def test_columnar_model_types(qtbot):
+    model = MColumnarTableModel(dtypes={'value': np.float32})
+    model.setHorizontalHeaderLabels(['label', 'count', 'value'])
+    model.set_rows(ROWS)
+    labels, _ = model.column_array(0)
+    counts, _ = model.column_array(1)
+    values, valid = model.column_array(2)
+    assert labels.dtype == object
+    assert counts.dtype.kind == 'i'
+    assert values.dtype == np.float32 and list(valid) == [True, True, False]
+    assert model.row_values(1) == ['b', 2, 2.5]
+
+    model.setData(model.index(0, 1), 'many')
+    assert model.column_array(1)[0].dtype == object
+    assert model.row_values(0) == ['a', 'many', 1.5]
+
+    model.sort(2, Qt.DescendingOrder)
+    assert list(model.column_array(0)[0]) == ['b', 'a', 'c']
+
+    # python ints too large for the dtype of the first value
+    big = [{'count': 1}, {'count': 2 ** 70}, {'count': -1},
+           {'value': 2 ** 70}]
+    model.set_rows(big)
+    assert model.column_array(1)[0].dtype == object
+    assert model.column_array(2)[0].dtype == object
+    assert [model.value(row, 1) for row in range(3)] == [1, 2 ** 70, -1]
+    assert model.value(3, 2) == 2 ** 70
+    model.set_rows([{'count': -1}, {'count': 2 ** 64 - 1}])
+    assert model.value(1, 1) == 2 ** 64 - 1
+
+
+def test_columnar_model_writes_keep_values(make_table):
+    widget = make_table(model=MColumnarTableModel,
+                        table_dtypes={'count': np.int32})
+    view = widget.tableView
+    model = view.model()
+    assert model.column_array(1)[0].dtype == np.int32
+
+    # ints out of the range of the column, through the delegate and setData
+    view.set_cells(1, [0], [2 ** 40])
+    assert model.column_array(1)[0].dtype == object
+    assert model.value(0, 1) == 2 ** 40
+    model.set_rows(ROWS)
+    assert model.setData(model.index(1, 1), 2 ** 40)
+    assert model.value(1, 1) == 2 ** 40
+
+    # ints written to an inferred float column stay ints
+    model.set_rows(ROWS)
+    assert model.column_array(2)[0].dtype == np.float64
+    model.setData(model.index(0, 2), 3)
+    view.set_cells(2, [1], [4])
+    model.append_rows([{'value': 5}])
+    values = [row['value'] for row in widget.get_parameters()['table'][1:-1]]
+    assert values == [3, 4, None, 5]
+    assert all(type(value) is int for value in values if value is not None)
+
+
+@pytest.mark.parametrize('model', [MStandardItemModel, MColumnarTableModel])
+def test_schema_dtypes_and_defaults(model, make_table):
+    widget = make_table(model=model, rows=[{'label': 'a'}],
+                        table_dtypes={'value': np.float32},
+                        table_defaults={'count': 0})
+    schema = widget.tableView.schema
+    assert schema is widget.table_schema is widget.tableView.itemDelegate().schema
+    assert schema['value'].index == 2 and schema[1].name == 'count'
+    assert schema.dtypes == {'value': np.dtype(np.float32)}
+    assert labels(widget) == ['a']
+    assert widget.get_row_parameters(0)['table'] == {
+        'label': 'a', 'count': 0, 'value': None}
+    widget._addRow()
+    assert widget.get_row_parameters(1)['table']['count'] == 0
+    if model is MColumnarTableModel:
+        assert widget.tableView.model().column_array(2)[0].dtype == np.float32
+
+
+def test_custom_delegate(make_table):
+    class Delegate(QStyledItemDelegate):
+        def __init__(self, parent, name, editor_map):
+            super().__init__(parent)
+            self.editor_map = editor_map
+
+    widget = make_table(delegate=Delegate)
+    assert isinstance(widget.tableView.itemDelegate(), Delegate)
+    assert labels(widget) == ['a', 'b', 'c']
+
+
+@pytest.mark.parametrize('model', [QStandardItemModel, MStandardItemModel,
+                                   MColumnarTableModel])
+def test_update_coupled_columns(model, make_table):
+    def number_rows(columns):
+        calls.append(columns)
+        return {'count': np.arange(1, len(columns['label']) + 1),
+                'value': np.where(columns['value'] == None, 0.,  # noqa: E711
+                                  columns['value'])}
+
+    calls = []
+    widget = make_table(model=model, update_coupled_columns=number_rows)
+    changes = []
+    widget.tableView.model().dataChanged.connect(
+        lambda top_left, bottom_right, *args: changes.append(
+            (top_left.row(), bottom_right.row(), top_left.column())))
+    select_rows(widget, 0)
+    widget._delRow()
+    assert set(calls[-1]) == {'label', 'count', 'value'}
+    assert widget.get_parameters()['table'][1:-1] == [
+        {'label': 'b', 'count': 1, 'value': 2.5},
+        {'label': 'c', 'count': 2, 'value': 0.}]
+    if model is not QStandardItemModel:
+        assert changes == [(0, 1, 1), (1, 1, 2)]
+
+
+@pytest.mark.parametrize('row_dependence, checked', [
+    ('row', [2, 3]), ('neighbours', [1, 2, 3, 4]), ('position', [2, 3]),
+    ('table', [0, 1, 2, 3, 4, 5])])
+def test_only_dirty_rows_are_checked(row_dependence, checked, make_table):
+    def update_coupled_parameters(requested, current, row):
+        rows.append(row)
+        return {}
+
+    widget = make_table(rows=[{'label': label} for label in 'abcdef'],
+                        update_coupled_parameters=update_coupled_parameters,
+                        row_dependence=row_dependence)
+    rows = []
+    select_rows(widget, 3)
+    widget._upRow()
+    assert rows == checked
+
+    rows.clear()
+    select_rows(widget, 4)
+    widget._delRow()
+    expected = {'row': [3, 4], 'neighbours': [2, 3, 4],
+                'position': [3, 4], 'table': [0, 1, 2, 3, 4]}
+    assert rows == expected[row_dependence]
+
+
+def test_auto_size_is_incremental_and_coalesced(table, qtbot, monkeypatch):
+    view = table.tableView
+    qtbot.wait(10)
+    resized = []
+    monkeypatch.setattr(view, 'resizeColumnToContents',
+                        lambda column: resized.append(('column', column)))
+    monkeypatch.setattr(view, 'resizeRowToContents',
+                        lambda row: resized.append(('row', row)))
+    model = view.model()
+    model.setData(model.index(1, 2), 10.5)
+    model.setData(model.index(1, 2), 11.5)
+    model.setData(model.index(2, 2), 12.5)
+    assert resized == []
+
+    qtbot.waitUntil(lambda: bool(resized))
+    assert resized == [('column', 2), ('row', 1), ('row', 2)]
+
+
+def test_display_text_cache(table):
+    delegate = table.tableView.itemDelegate()
+
+    class Device:
+        def __init__(self, name):
+            self.name = name
+
+    motor = Device('motor')
+    assert delegate.displayText([motor, 'x', 1], None) == '[motor, x, 1]'
+    assert delegate.displayText({'a': 1.0}, None) == '{a: 1.0}'
+    assert delegate.displayText(True, None) == 'True'
+    motor.name = 'renamed'
+    assert delegate.displayText([motor, 'x', 1], None) == '[motor, x, 1]'
+
+    model = table.tableView.model()
+    model.setData(model.index(0, 0), 'z')
+    assert delegate.displayText([motor, 'x', 1], None) == '[renamed, x, 1]'
+    assert delegate.displayText([{1, 2}], None) == '[{1, 2}]'
+
+    class Formatted(MTableItemDelegate):
+        pass
+
+    Formatted.register_formatter(Device, lambda device: device.name.upper())
+    formatted = Formatted(table.tableView, 'formatted')
+    assert formatted.displayText([motor], None) == '[RENAMED]'
+    assert Device not in MTableItemDelegate.formatters
+
+
+def test_function_queue(make_table, qtbot, monkeypatch):
+    release = threading.Event()
+    entered = threading.Event()
+
+    def function(label, count, value, scale):
+        if label == 'b':
+            entered.set()
+            while not (release.is_set() or threads.cancellation_requested()):
+                time.sleep(.01)
+        if label == 'c':
+            raise ValueError('no c')
+        return count * scale
+
+    widget = make_table(function, widget=MFunctionTableInterfaceWidget,
+                        prefix={'scale': 2},
+                        prefix_editor_map={'scale': MISpin})
+    queue = widget.queue
+    prefix_reads = []
+    get_prefix_parameters = widget.get_prefix_parameters
+    monkeypatch.setattr(widget, 'get_prefix_parameters',
+                        lambda: prefix_reads.append(1) or get_prefix_parameters())
+
+    widget.execute_all()
+    assert len(prefix_reads) == 1
+    qtbot.waitUntil(lambda: queue.status(1) == 'running')
+    assert queue.status(0) == 'done' and queue.entries[0].result == 2
+    widget.pause()
+    release.set()
+    qtbot.waitUntil(lambda: queue.status(1) == 'done')
+    assert queue.status(2) == 'queued' and not queue.running
+    widget.pause(False)
+    qtbot.waitUntil(lambda: queue.status(2) == 'failed')
+    assert isinstance(queue.entries[2].error, ValueError)
+    assert queue.elapsed(2) >= 0 and not widget.abortBtn.isEnabled()
+
+    release.clear()
+    entered.clear()
+    select_rows(widget, 1, 2)
+    widget.execute()
+    qtbot.waitUntil(entered.is_set)
+    with qtbot.waitSignal(queue.sigIdle):
+        widget.abort()
+        assert queue.status(4) == 'aborted'
+    # the running call returned after being asked to stop, so it is done
+    assert queue.status(3) == 'done'
+    assert [entry.label for entry in queue.entries] == [1, 2, 3, 2, 3]
+    queue.clear()
+    assert queue.rowCount() == 0
+
+
+def test_function_queue_after_shutdown(make_table, qtbot, monkeypatch):
+    monkeypatch.setattr(threads, 'manager', threads.ThreadManager())
+    threads.manager.shutdown(timeout=1.)
+    widget = make_table(lambda **parameters: None,
+                        widget=MFunctionTableInterfaceWidget)
+    queue = widget.queue
+
+    with qtbot.waitSignal(queue.sigIdle):
+        widget.execute_all()
+    assert [queue.status(row) for row in range(3)] == ['aborted'] * 3
+    assert not queue.running and queue.pending == 0